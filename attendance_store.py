@@ -0,0 +1,275 @@
+from pymongo import UpdateOne
+
+# Attendance lives in its own collection, one row per (courseCode, rollNumber, lectureDate):
+#   {"courseCode": "CS401", "rollNumber": "2101", "lectureDate": "11/4", "present": 1}
+# A missing row means absent. Course documents keep only the roster and the ordered
+# lectureDates, and are marked with ATTENDANCE_STORE once migrate_attendance.py has moved
+# their embedded students[].attendance arrays over.
+
+ATTENDANCE_STORE = "collection"
+WRITE_BATCH_SIZE = 1000
+REGISTER_BATCH_SIZE = 500
+
+
+def is_migrated(course):
+    return course.get("attendanceStore") == ATTENDANCE_STORE
+
+
+def roll_key(roll_number):
+    # Roll numbers are stored as strings everywhere. Clients and spreadsheets send 2101 or
+    # 2101.0 as often as "2101", and BSON never matches or sorts a number like a string.
+    if isinstance(roll_number, float) and roll_number.is_integer():
+        roll_number = int(roll_number)
+    return str(roll_number).strip()
+
+
+def normalize_students(students):
+    # A sheet as sent by a client, with every roll number as roll_key()
+    return [{**s, "rollNumber": roll_key(s.get("rollNumber"))} for s in students]
+
+
+def roster_of(students):
+    # Course documents only keep who is enrolled, never the attendance itself
+    return [{k: v for k, v in s.items() if k != "attendance"} for s in normalize_students(students)]
+
+
+def rows_from_students(course_code, students, lecture_dates):
+    # Embedded positional arrays -> attendance rows (only the present cells are stored)
+    for student in students:
+        attendance = student.get("attendance") or []
+        for index, date in enumerate(lecture_dates):
+            if index < len(attendance) and attendance[index] == 1:
+                yield {"courseCode": course_code, "rollNumber": roll_key(student["rollNumber"]), "lectureDate": date, "present": 1}
+
+
+def students_from_rows(students, lecture_dates, rows):
+    # Attendance rows -> the embedded shape attend_teach.html has always received
+    present = {(r["rollNumber"], r["lectureDate"]) for r in rows if r.get("present") == 1}
+    return [
+        {**s, "attendance": [1 if (s.get("rollNumber"), date) in present else 0 for date in lecture_dates]}
+        for s in students
+    ]
+
+
+def write_rows(attendance_collection, rows, batch_size=WRITE_BATCH_SIZE):
+    # Idempotent upserts in unordered batches; returns how many rows were sent
+    batch, sent = [], 0
+    for row in rows:
+        key = {"courseCode": row["courseCode"], "rollNumber": row["rollNumber"], "lectureDate": row["lectureDate"]}
+        batch.append(UpdateOne(key, {"$set": {"present": row["present"]}}, upsert=True))
+        if len(batch) >= batch_size:
+            attendance_collection.bulk_write(batch, ordered=False)
+            sent += len(batch)
+            batch = []
+    if batch:
+        attendance_collection.bulk_write(batch, ordered=False)
+        sent += len(batch)
+    return sent
+
+
+def mark(attendance_collection, course_code, lecture_date, roll_numbers, present):
+    # Sets one lecture's cell for the given roll numbers; costs O(len(roll_numbers))
+    return write_rows(attendance_collection, (
+        {"courseCode": course_code, "rollNumber": roll_key(roll), "lectureDate": lecture_date, "present": present}
+        for roll in roll_numbers
+    ))
+
+
+def replace_sheet(attendance_collection, course_code, students, lecture_dates):
+    # Full-sheet save for a migrated course: diff against what is stored and only write
+    # the cells that actually changed
+    stored = {
+        (r["rollNumber"], r["lectureDate"])
+        for r in attendance_collection.find({"courseCode": course_code, "present": 1}, {"rollNumber": 1, "lectureDate": 1})
+    }
+    wanted = {(r["rollNumber"], r["lectureDate"]) for r in rows_from_students(course_code, students, lecture_dates)}
+    changes = [(cell, 1) for cell in wanted - stored] + [(cell, 0) for cell in stored - wanted]
+    return write_rows(attendance_collection, (
+        {"courseCode": course_code, "rollNumber": roll, "lectureDate": date, "present": present}
+        for (roll, date), present in changes
+    ))
+
+
+def apply_lecture(attendance_collection, course_code, lecture_date, present_rolls):
+    # One lecture's whole column: the listed roll numbers present, everyone else absent
+    mark(attendance_collection, course_code, lecture_date, present_rolls, 1)
+    present_rolls = [roll_key(r) for r in present_rolls]
+    attendance_collection.update_many(
+        {"courseCode": course_code, "lectureDate": lecture_date, "present": 1, "rollNumber": {"$nin": present_rolls}},
+        {"$set": {"present": 0}}
+    )
+
+
+# --- Summaries (aggregation pipelines) ---
+
+def _percentage(present, lectures):
+    # Same rounding attend_teach.html has always shown
+    return int(present * 100 / lectures + 0.5) if lectures else 0
+
+
+def _present_counts(courses_collection, attendance_collection, course):
+    # Returns ({rollNumber: present lectures}, {lectureDate: present students}) from the database
+    code = course["courseCode"]
+    lecture_dates = course.get("lectureDates", [])
+    if not lecture_dates:
+        return {}, {}
+
+    if is_migrated(course):
+        pipeline = [
+            {"$match": {
+                "courseCode": code,
+                "present": 1,
+                "lectureDate": {"$in": lecture_dates},
+                "rollNumber": {"$in": [s.get("rollNumber") for s in course.get("students", [])]}
+            }},
+            {"$facet": {
+                "byStudent": [{"$group": {"_id": "$rollNumber", "present": {"$sum": 1}}}],
+                "byLecture": [{"$group": {"_id": "$lectureDate", "present": {"$sum": 1}}}]
+            }}
+        ]
+        result = next(attendance_collection.aggregate(pipeline))
+        by_lecture = {g["_id"]: g["present"] for g in result["byLecture"]}
+    else:
+        pipeline = [
+            {"$match": {"courseCode": code}},
+            {"$unwind": "$students"},
+            {"$project": {
+                "_id": 0,
+                "rollNumber": "$students.rollNumber",
+                "attendance": {"$slice": [{"$ifNull": ["$students.attendance", []]}, len(lecture_dates)]}
+            }},
+            {"$unwind": {"path": "$attendance", "includeArrayIndex": "lecture"}},
+            {"$match": {"attendance": 1}},
+            {"$facet": {
+                "byStudent": [{"$group": {"_id": "$rollNumber", "present": {"$sum": 1}}}],
+                "byLecture": [{"$group": {"_id": "$lecture", "present": {"$sum": 1}}}]
+            }}
+        ]
+        result = next(courses_collection.aggregate(pipeline))
+        by_lecture = {lecture_dates[g["_id"]]: g["present"] for g in result["byLecture"]}
+
+    return {g["_id"]: g["present"] for g in result["byStudent"]}, by_lecture
+
+
+def course_summary(courses_collection, attendance_collection, course):
+    # Per-student percentages and per-lecture turnout for one course
+    lecture_dates = course.get("lectureDates", [])
+    lectures = len(lecture_dates)
+    students = course.get("students", [])
+    by_student, by_lecture = _present_counts(courses_collection, attendance_collection, course)
+
+    return {
+        "courseCode": course["courseCode"],
+        "lectures": lectures,
+        "students": [
+            {
+                "rollNumber": s.get("rollNumber"),
+                "name": s.get("name"),
+                "present": by_student.get(s.get("rollNumber"), 0),
+                "percentage": _percentage(by_student.get(s.get("rollNumber"), 0), lectures)
+            }
+            for s in students
+        ],
+        "lectureTurnout": [
+            {
+                "lectureDate": date,
+                "present": by_lecture.get(date, 0),
+                "percentage": _percentage(by_lecture.get(date, 0), len(students))
+            }
+            for date in lecture_dates
+        ]
+    }
+
+
+def student_summary(courses_collection, attendance_collection, roll_number, course_code=None, detail=False):
+    # One student's attendance in every course they are enrolled in, without loading classmates
+    match = {"students.rollNumber": roll_number}
+    if course_code:
+        match["courseCode"] = course_code
+    courses = list(courses_collection.aggregate([
+        {"$match": match},
+        {"$project": {
+            "_id": 0, "courseCode": 1, "name": 1, "lectureDates": 1, "attendanceStore": 1,
+            "me": {"$arrayElemAt": [
+                {"$filter": {"input": "$students", "as": "s", "cond": {"$eq": ["$$s.rollNumber", roll_number]}}}, 0
+            ]}
+        }}
+    ]))
+
+    migrated_codes = [c["courseCode"] for c in courses if is_migrated(c)]
+    present_dates = {}
+    if migrated_codes:
+        for row in attendance_collection.find(
+            {"rollNumber": roll_number, "courseCode": {"$in": migrated_codes}, "present": 1},
+            {"courseCode": 1, "lectureDate": 1, "_id": 0}
+        ):
+            present_dates.setdefault(row["courseCode"], set()).add(row["lectureDate"])
+
+    summaries = []
+    for course in courses:
+        lecture_dates = course.get("lectureDates", [])
+        if is_migrated(course):
+            dates = present_dates.get(course["courseCode"], set())
+            attendance = [1 if date in dates else 0 for date in lecture_dates]
+        else:
+            own = (course.get("me") or {}).get("attendance") or []
+            attendance = [1 if i < len(own) and own[i] == 1 else 0 for i in range(len(lecture_dates))]
+        present = sum(attendance)
+        summary = {
+            "courseCode": course["courseCode"],
+            "name": course.get("name"),
+            "lectures": len(lecture_dates),
+            "present": present,
+            "percentage": _percentage(present, len(lecture_dates))
+        }
+        if detail:
+            summary["studentName"] = (course.get("me") or {}).get("name")
+            summary["lectureDates"] = lecture_dates
+            summary["attendance"] = attendance
+        summaries.append(summary)
+    return summaries
+
+
+# --- Exports ---
+
+def register_rows(courses_collection, attendance_collection, course):
+    # The full register one student at a time: (rollNumber, name, [1/0 per lecture], present,
+    # percentage). `course` needs courseCode, lectureDates, attendanceStore and the roster;
+    # attendance is streamed from a cursor instead of being loaded with the course.
+    code = course["courseCode"]
+    lecture_dates = course.get("lectureDates", [])
+    lectures = len(lecture_dates)
+
+    if is_migrated(course):
+        # The roster in roll number order, REGISTER_BATCH_SIZE students at a time, each
+        # batch joined with just its own present rows, so memory does not grow with the
+        # size of the course. Roll numbers are strings on both sides (see roll_key).
+        column = {date: i for i, date in enumerate(lecture_dates)}
+        roster = sorted(course.get("students", []), key=lambda s: roll_key(s.get("rollNumber")))
+        for start in range(0, len(roster), REGISTER_BATCH_SIZE):
+            batch = roster[start:start + REGISTER_BATCH_SIZE]
+            present_at = {}
+            for row in attendance_collection.find(
+                {"courseCode": code, "present": 1, "rollNumber": {"$in": [roll_key(s.get("rollNumber")) for s in batch]}},
+                {"rollNumber": 1, "lectureDate": 1, "_id": 0}
+            ):
+                if row["lectureDate"] in column:
+                    present_at.setdefault(row["rollNumber"], set()).add(column[row["lectureDate"]])
+            for student in batch:
+                cells = present_at.get(roll_key(student.get("rollNumber")), ())
+                attendance = [1 if i in cells else 0 for i in range(lectures)]
+                present = sum(attendance)
+                yield student.get("rollNumber"), student.get("name"), attendance, present, _percentage(present, lectures)
+    else:
+        for student in courses_collection.aggregate([
+            {"$match": {"courseCode": code}},
+            {"$unwind": "$students"},
+            {"$project": {"_id": 0, "rollNumber": "$students.rollNumber", "name": "$students.name",
+                          "attendance": {"$ifNull": ["$students.attendance", []]}}},
+            # Same order as migrated courses
+            {"$sort": {"rollNumber": 1}}
+        ]):
+            own = student["attendance"]
+            attendance = [1 if i < len(own) and own[i] == 1 else 0 for i in range(lectures)]
+            present = sum(attendance)
+            yield student.get("rollNumber"), student.get("name"), attendance, present, _percentage(present, lectures)
@@ -0,0 +1,116 @@
+import os
+import secrets
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+# Signed, expiring session tokens issued at login.
+#
+# The token carries everything the routes need to know about the caller (username, role,
+# approval state, roll number), so @require_auth checks a request with no database read
+# and routes take identity from g.user instead of trusting usernames or roles sent by the
+# client. Tokens are stateless: a change (approval, new roll number, deleted account) is
+# only seen once the user logs in again or the token expires after TOKEN_MAX_AGE seconds.
+
+TOKEN_MAX_AGE = 12 * 60 * 60
+TOKEN_SALT = "session"
+
+# Plain links (file downloads) cannot send an Authorization header, so they carry a link
+# token in ?token=: signed separately, valid for one purpose and only LINK_TOKEN_MAX_AGE
+# seconds, so one that leaks through an access log, browser history or a Referer header
+# is of no use. Session tokens are only ever read from the header.
+LINK_TOKEN_MAX_AGE = 60
+LINK_TOKEN_SALT = "link"
+
+
+class TokenSigner:
+    def __init__(self, secret_key, max_age=TOKEN_MAX_AGE, link_max_age=LINK_TOKEN_MAX_AGE):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+        self._link_serializer = URLSafeTimedSerializer(secret_key, salt=LINK_TOKEN_SALT)
+        self.max_age = max_age
+        self.link_max_age = link_max_age
+
+    def issue(self, username, role, approved, roll_number=None):
+        return self._serializer.dumps({"u": username, "r": role, "a": bool(approved), "n": roll_number})
+
+    def verify(self, token):
+        # Claims dict, or None for a missing, tampered or expired token
+        try:
+            claims = self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+        return {"username": claims["u"], "role": claims["r"], "approved": claims["a"], "rollNumber": claims["n"]}
+
+    def issue_link(self, user, purpose):
+        # user: verified claims (g.user) of the session asking for the link
+        return self._link_serializer.dumps({
+            "u": user["username"], "r": user["role"], "a": user["approved"], "n": user["rollNumber"], "p": purpose
+        })
+
+    def verify_link(self, token, purpose):
+        try:
+            claims = self._link_serializer.loads(token, max_age=self.link_max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+        if claims.get("p") != purpose:
+            return None
+        return {"username": claims["u"], "role": claims["r"], "approved": claims["a"], "rollNumber": claims["n"]}
+
+
+def load_secret_key(path):
+    # SECRET_KEY from the environment, or else a random key generated once and kept in
+    # path so every worker (and the next restart) signs with the same one. Never derived
+    # from configuration, which may be public.
+    if os.environ.get("SECRET_KEY"):
+        return os.environ["SECRET_KEY"]
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secrets.token_hex(32))
+    try:
+        # Atomic and fails if another worker got there first; then its key wins
+        os.link(tmp, path)
+        print(f"✅ SECRET_KEY is not set, generated one in {path}")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _bearer_token():
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip()
+    return None
+
+
+def require_auth(signer, roles=None, link=None):
+    # Route decorator: 401 without a valid token, 403 for unapproved accounts or other roles.
+    # The verified claims are in g.user. Routes opened by plain links pass link=<purpose>
+    # and then also accept a link token for that purpose in ?token=.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _bearer_token()
+            user = signer.verify(token) if token else None
+            if not user and link and request.args.get("token"):
+                user = signer.verify_link(request.args["token"], link)
+            if not user:
+                return jsonify({"message": "Please log in again."}), 401
+            if not user["approved"]:
+                return jsonify({"message": "Access Denied: Your account is pending Admin approval."}), 403
+            if roles and user["role"] not in roles:
+                return jsonify({"message": "You are not allowed to do this."}), 403
+            g.user = user
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,413 @@
+"""Load test: replay the pages' traffic against the API and report latency per route.
+
+    python bench/api_load.py --users 200 --duration 60                      # in-process, mongomock
+    python bench/api_load.py --mongo-uri mongodb://127.0.0.1:27017 --users 500
+    python bench/api_load.py --url http://127.0.0.1:8000 --mongo-uri mongodb://127.0.0.1:27017
+
+The database is seeded first (see bench/seed.py for the data and its size options). Then
+every virtual user logs in at once, which is the login burst at the start of a class,
+and keeps replaying what its page does:
+
+  doubts      a student on doubts.html: profile, enrolled courses, the newest page of the
+              chat, then a ?since= poll every --poll-interval seconds (3, like the page)
+  exam        a student on exam.html: the exam list with ?include=status (or, with
+              --exam-fanout, one /api/exams/status call per exam as the page used to),
+              then sometimes starts, loads and submits an exam it has not taken
+  attendance  a teacher on attend_teach.html: loads the register of one of their
+              courses, flips a cell and saves the whole sheet, reads the summary, and
+              now and then answers in the course chat
+
+--mix sets the share of each kind of user. Think times are divided by --speedup to
+compress a class hour into a short run.
+
+Without --url the app is imported and driven through Flask's test client, with its
+MongoClient replaced by one for --mongo-uri or, without it, by mongomock (pip install
+mongomock). mongomock is not thread-safe, so each request then runs alone and is timed
+without the wait for its turn: the numbers show the cost of each route and catch
+regressions, not capacity. For worker sizing run gunicorn against a local mongod and
+use --url, with the server's MONGO_URI and DB_NAME pointing at the database this script
+seeds:
+
+    MONGO_URI=mongodb://127.0.0.1:27017 WEB_WORKER_CLASS=gevent gunicorn app:app -c gunicorn.conf.py
+
+The report gives requests, throughput, p50/p99 latency and 4xx/5xx counts per route.
+--save-baseline writes it to --baseline (bench/baseline.json), and later runs are
+compared with that file: a route whose p99 grows, or whose throughput drops, by more than
+--tolerance percent is marked, and --fail-on-regression turns that into exit status 1.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import quote, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import seed as seeding  # noqa: E402
+
+MIN_RPS_SAMPLES = 50
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+# --- Transports ---
+
+class InProcessClient:
+    def __init__(self, app, lock):
+        self._client = app.test_client()
+        self._lock = lock
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        # Timed inside the lock, so waiting for other users' requests is not counted
+        with self._lock:
+            started = time.perf_counter()
+            response = self._client.open(path, method=method, json=body, headers=headers)
+            data = response.get_data()
+            return response.status_code, data, time.perf_counter() - started
+
+
+class HttpClient:
+    # One keep-alive connection per virtual user, like a browser tab
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self._host, self._port = parsed.hostname, parsed.port or 80
+        self._conn = None
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=60)
+            try:
+                started = time.perf_counter()
+                self._conn.request(method, path, payload, headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                return response.status, data, time.perf_counter() - started
+            except (http.client.HTTPException, OSError):
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+
+
+class NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# --- Recording ---
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def call(self, client, label, method, path, body=None, token=None):
+        started = time.perf_counter()
+        try:
+            status, data, elapsed = client.request(method, path, body, token)
+        except Exception:
+            status, data, elapsed = 599, b"", time.perf_counter() - started
+        with self._lock:
+            self.samples[label].append(elapsed)
+            self.statuses[label][status // 100] += 1
+        return status, data
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for label, samples in sorted(recorder.samples.items()):
+        statuses = recorder.statuses[label]
+        routes[label] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "4xx": statuses[4],
+            "5xx": statuses[5],
+        }
+    return routes
+
+
+# --- Virtual users ---
+
+class Stop(Exception):
+    pass
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, kind, username, client, recorder, world, args, deadline, start_gate):
+        super().__init__(daemon=True)
+        self.kind, self.username = kind, username
+        self.client, self.recorder, self.world, self.args = client, recorder, world, args
+        self.deadline, self.start_gate = deadline, start_gate
+        self.token = None
+        self.rng = random.Random(f"{args.seed}-{username}")
+
+    def call(self, label, method, path, body=None):
+        if time.monotonic() >= self.deadline:
+            raise Stop()
+        status, data = self.recorder.call(self.client, label, method, path, body, self.token)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def sleep(self, seconds):
+        seconds /= self.args.speedup
+        if time.monotonic() + seconds >= self.deadline:
+            raise Stop()
+        time.sleep(seconds)
+
+    def run(self):
+        self.start_gate.wait()
+        try:
+            role = "teacher" if self.kind == "attendance" else "student"
+            status, data = self.call("POST /api/login", "POST", "/api/login",
+                                     {"username": self.username, "password": self.args.password, "userType": role})
+            if status != 200:
+                return
+            self.token = data.get("token")
+            getattr(self, f"run_{self.kind}")()
+        except Stop:
+            pass
+
+    def run_doubts(self):
+        _, profile = self.call("GET /api/profile/<username>", "GET", f"/api/profile/{self.username}")
+        roll = (profile or {}).get("rollNumber")
+        _, courses = self.call("GET /api/courses?student_roll", "GET", f"/api/courses?student_roll={roll}")
+        if not courses:
+            return
+        code = self.rng.choice(courses)["courseCode"]
+        _, page = self.call("GET /api/doubts/<code>?limit", "GET", f"/api/doubts/{code}?limit=100")
+        cursor = (page or {}).get("cursor")
+        while True:
+            self.sleep(self.args.poll_interval)
+            if not cursor:
+                return
+            status, delta = self.call("GET /api/doubts/<code>?since", "GET",
+                                      f"/api/doubts/{code}?since={quote(cursor)}")
+            if status == 200 and delta:
+                cursor = delta.get("cursor") or cursor
+
+    def run_exam(self):
+        taken = set()
+        while True:
+            if self.args.exam_fanout:
+                _, exams = self.call("GET /api/exams", "GET", "/api/exams")
+                for exam in exams or []:
+                    _, result = self.call("POST /api/exams/status", "POST", "/api/exams/status", {"examId": exam["_id"]})
+                    exam["resultStatus"] = (result or {}).get("status", "new")
+            else:
+                _, exams = self.call("GET /api/exams?include=status", "GET", "/api/exams?include=status")
+            fresh = [e for e in exams or [] if e.get("resultStatus") == "new" and e["_id"] not in taken]
+            if fresh and self.rng.random() < 0.3:
+                exam_id = self.rng.choice(fresh)["_id"]
+                taken.add(exam_id)
+                self.call("POST /api/exams/start", "POST", "/api/exams/start", {"examId": exam_id})
+                _, paper = self.call("GET /api/exams/<id>/paper", "GET", f"/api/exams/{exam_id}/paper")
+                self.sleep(self.args.think * 5)
+                answers = [self.rng.randint(0, 3) for _ in (paper or {}).get("questions", [])]
+                self.call("POST /api/exams/submit", "POST", "/api/exams/submit", {"examId": exam_id, "answers": answers})
+            self.sleep(self.args.think * 10)
+
+    def run_attendance(self):
+        own = [code for code, creator in self.world["courses"].items() if creator == self.username]
+        if not own:
+            return
+        code = self.rng.choice(own)
+        while True:
+            _, sheet = self.call("GET /api/attendance/<code>", "GET", f"/api/attendance/{code}")
+            if sheet and sheet.get("students"):
+                student = self.rng.choice(sheet["students"])
+                if student.get("attendance"):
+                    student["attendance"][0] ^= 1
+                self.call("POST /api/attendance/<code>", "POST", f"/api/attendance/{code}", {
+                    "students": sheet["students"], "lectureDates": sheet["lectureDates"],
+                    "attendanceVersion": sheet.get("attendanceVersion")
+                })
+            self.call("GET /api/attendance/<code>/summary", "GET", f"/api/attendance/{code}/summary")
+            if self.rng.random() < 0.3:
+                self.call("POST /api/doubts", "POST", "/api/doubts", {"courseCode": code, "message": "See the notes."})
+            self.sleep(self.args.think * 20)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, share = part.partition("=")
+        if kind not in ("doubts", "exam", "attendance"):
+            raise argparse.ArgumentTypeError(f"unknown user kind {kind!r}")
+        mix[kind] = float(share)
+    return mix
+
+
+def plan_users(world, args):
+    total = sum(args.mix.values())
+    counts = {kind: int(round(args.users * share / total)) for kind, share in args.mix.items()}
+    rng = random.Random(args.seed)
+    students = rng.sample(world["students"], min(len(world["students"]), counts.get("doubts", 0) + counts.get("exam", 0)))
+    teachers = world["teachers"]
+    plan = []
+    for kind in ("doubts", "exam"):
+        plan += [(kind, students.pop()) for _ in range(min(counts.get(kind, 0), len(students)))]
+    plan += [("attendance", teachers[i % len(teachers)]) for i in range(counts.get("attendance", 0))]
+    return plan
+
+
+# --- Setup ---
+
+def connect(args):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        seeding.check_local(args.mongo_uri, args.allow_remote)
+        return MongoClient(args.mongo_uri), False
+    if args.url:
+        sys.exit("--url needs --mongo-uri: the server's database has to be seeded")
+    import mongomock
+    return mongomock.MongoClient(), True
+
+
+def load_app(client, args):
+    # db.py builds the app's MongoClient; hand it ours instead. Logins would rehash the
+    # seeded passwords if the app's cost differed from the seed's
+    import pymongo
+    os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = args.db
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    pymongo.MongoClient = lambda *a, **k: client
+    import app as app_module
+    return app_module.app
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(routes, baseline, tolerance):
+    # Prints the change against the baseline; returns the routes that regressed
+    regressions = []
+    print(f"\nAgainst baseline from {baseline['meta'].get('date')} ({baseline['meta'].get('revision')}):")
+    for label, now in routes.items():
+        before = baseline["routes"].get(label)
+        if not before:
+            print(f"  {label:38} new")
+            continue
+        p99 = (now["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100 if before["p99_ms"] else 0
+        rps = (now["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0
+        p50 = (now["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        # Throughput of a route hit a handful of times is mostly noise
+        worse = p99 > tolerance or (rps < -tolerance and before["requests"] >= MIN_RPS_SAMPLES)
+        if worse:
+            regressions.append(label)
+        print(f"  {label:38} p50 {p50:+6.1f}%  p99 {p99:+6.1f}%  req/s {rps:+6.1f}%{'  <- regression' if worse else ''}")
+    return regressions
+
+
+def main(args):
+    client, serialize = connect(args)
+    started = time.perf_counter()
+    world = seeding.seed(client[args.db], args)
+    print(f"Seeded in {time.perf_counter() - started:.1f} s: {len(world['students'])} students, "
+          f"{len(world['courses'])} courses of {args.roster} x {args.lectures} lectures")
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+        target = args.url
+    else:
+        app = load_app(client, args)
+        lock = threading.Lock() if serialize else NullLock()
+        make_client = lambda: InProcessClient(app, lock)  # noqa: E731
+        target = "in-process (mongomock)" if serialize else "in-process"
+
+    recorder = Recorder()
+    gate = threading.Event()
+    deadline = time.monotonic() + args.duration
+    users = [VirtualUser(kind, name, make_client(), recorder, world, args, deadline, gate)
+             for kind, name in plan_users(world, args)]
+    for user in users:
+        user.start()
+    print(f"{len(users)} virtual users against {target} for {args.duration} s")
+    run_started = time.perf_counter()
+    gate.set()
+    for user in users:
+        user.join(max(0, deadline - time.monotonic()) + 30)
+    elapsed = time.perf_counter() - run_started
+
+    routes = summarize(recorder, elapsed)
+    print(f"\n{'route':40} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'4xx':>5} {'5xx':>5}")
+    for label, r in routes.items():
+        print(f"{label:40} {r['requests']:8} {r['rps']:8.1f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} {r['4xx']:5} {r['5xx']:5}")
+
+    result = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"), "revision": git_revision(),
+            "target": target, "python": platform.python_version(), "cpus": os.cpu_count(),
+            "users": len(users), "duration": args.duration, "speedup": args.speedup,
+            "mix": args.mix, "examFanout": args.exam_fanout,
+            "data": {k: getattr(args, k) for k in ("students", "teachers", "courses", "roster", "lectures",
+                                                    "doubts", "posts", "exams", "questions", "bcrypt_rounds")},
+        },
+        "routes": routes,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("target") != target or baseline["meta"].get("data") != result["meta"]["data"]:
+            print("\nBaseline was recorded with a different target or data set; numbers are not comparable")
+        regressions = compare(routes, baseline, args.tolerance)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay page traffic against the API and report per-route latency")
+    parser.add_argument("--url", help="running server to test (default: the app in-process)")
+    parser.add_argument("--mongo-uri", help="local mongod to seed and use (default: mongomock)")
+    parser.add_argument("--allow-remote", action="store_true", help="allow a non-local mongod (its data is dropped)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("doubts=70,exam=20,attendance=10"))
+    parser.add_argument("--poll-interval", type=float, default=3, help="doubts.html polling interval in seconds")
+    parser.add_argument("--think", type=float, default=1, help="base think time in seconds")
+    parser.add_argument("--speedup", type=float, default=1, help="divide every wait by this")
+    parser.add_argument("--exam-fanout", action="store_true", help="one status request per exam instead of ?include=status")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=20, help="percent")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    seeding.add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,176 @@
+"""Concurrency test: racing exam start/submit/lock calls against the results service.
+
+    python bench/exam_submit_concurrency.py --students 2000 --threads 64
+    python bench/exam_submit_concurrency.py --mongo-uri mongodb://127.0.0.1:27017 --mode both
+
+Every simulated student gets two starts, two submits (with different scores) and one lock,
+and all of them are shuffled together and fired from a thread pool at once, the way the
+close of a large exam hits the API. Afterwards the script checks the invariants the state
+machine in exam_results.py promises:
+
+  * exactly one result row per student
+  * at most one start wins, and exactly one of the submits/lock wins
+  * the stored row is the winner's (status and score), so a locked attempt was never
+    overwritten and a completed one never locked
+
+Without --mongo-uri the run uses mongomock (pip install mongomock), which checks the logic
+but says little about throughput; point it at a local mongod for real numbers. mongomock
+is not thread-safe, so its calls are serialized here to stand in for mongod's per-document
+atomicity; the requests still interleave in arbitrary order.
+
+The database named by --db is dropped before and after each run.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from exam_results import COMPLETED, LOCKED, ExamResults  # noqa: E402
+
+EXAM_ID = "bench-exam"
+
+
+class SerializedCollection:
+    # mongomock collection whose calls run one at a time, like single writes on mongod
+    def __init__(self, collection):
+        self._collection = collection
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return call
+
+
+def patch_mongomock_bulk():
+    # pymongo 4.9+ passes sort= to the bulk builder's add_update, which older mongomock
+    # releases do not accept; batched mode's bulk_write fails without this. The argument
+    # only matters for updateOne on several matches, which the unique index rules out here.
+    import inspect
+
+    from mongomock.collection import BulkOperationBuilder
+    add_update = BulkOperationBuilder.add_update
+    if "sort" in inspect.signature(add_update).parameters:
+        return
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+    BulkOperationBuilder.add_update = add_update_without_sort
+
+
+def connect(args):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(args.mongo_uri, maxPoolSize=args.threads + 10)
+    import mongomock
+    patch_mongomock_bulk()
+    return mongomock.MongoClient()
+
+
+def build_ops(students):
+    ops = []
+    for n in range(students):
+        username = f"student{n}"
+        ops += [("start", username, None), ("start", username, None)]
+        ops += [("submit", username, 10), ("submit", username, 20)]
+        ops.append(("lock", username, None))
+    random.shuffle(ops)
+    return ops
+
+
+def run(service, op):
+    kind, username, score = op
+    if kind == "start":
+        return service.start(EXAM_ID, username)
+    if kind == "submit":
+        return service.submit(EXAM_ID, username, score, 20)
+    return service.lock(EXAM_ID, username)
+
+
+def check(collection, ops, outcomes, students):
+    problems = []
+    rows = defaultdict(list)
+    for row in collection.find({"examId": EXAM_ID}):
+        rows[row["studentUsername"]].append(row)
+    if len(rows) != students:
+        problems.append(f"{students - len(rows)} students have no result row")
+
+    won = defaultdict(list)
+    for op, ok in zip(ops, outcomes):
+        if ok:
+            won[op[1]].append(op)
+
+    for username, stored in rows.items():
+        if len(stored) != 1:
+            problems.append(f"{username}: {len(stored)} rows")
+            continue
+        row = stored[0]
+        starts = [op for op in won[username] if op[0] == "start"]
+        finals = [op for op in won[username] if op[0] != "start"]
+        if len(starts) > 1:
+            problems.append(f"{username}: {len(starts)} starts won")
+        if len(finals) != 1:
+            problems.append(f"{username}: {len(finals)} submit/lock calls won")
+            continue
+        kind, _, score = finals[0]
+        expected = COMPLETED if kind == "submit" else LOCKED
+        if row["status"] != expected:
+            problems.append(f"{username}: {kind} won but row is {row['status']}")
+        elif kind == "submit" and row["score"] != score:
+            problems.append(f"{username}: winning score {score} but row has {row['score']}")
+    return problems
+
+
+def bench(client, args, batch_writes):
+    db = client[args.db]
+    client.drop_database(args.db)
+    collection = db.exam_results
+    if not args.mongo_uri:
+        collection = SerializedCollection(collection)
+    collection.create_index([("examId", 1), ("studentUsername", 1)], unique=True)
+    service = ExamResults(collection, batch_writes=batch_writes)
+
+    ops = build_ops(args.students)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = list(pool.map(lambda op: run(service, op), ops))
+    elapsed = time.perf_counter() - started
+
+    label = "batched" if batch_writes else "sync"
+    problems = check(collection, ops, outcomes, args.students)
+    print(f"{label:8} {len(ops)} calls in {elapsed:.2f}s ({len(ops) / elapsed:.0f}/s), "
+          f"{sum(outcomes)} transitions applied")
+    for problem in problems[:20]:
+        print(f"  ❌ {problem}")
+    if not problems:
+        print("  ✅ one row per student, exactly one winner, no overwritten attempts")
+    return not problems
+
+
+def main(args):
+    client = connect(args)
+    modes = {"sync": [False], "batch": [True], "both": [False, True]}[args.mode]
+    ok = all([bench(client, args, batch_writes) for batch_writes in modes])
+    client.drop_database(args.db)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fire concurrent exam start/submit/lock calls and check the results")
+    parser.add_argument("--mongo-uri", help="local mongod to test against (default: mongomock)")
+    parser.add_argument("--db", default="exam_results_bench", help="scratch database, dropped before and after")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--mode", choices=["sync", "batch", "both"], default="both")
+    main(parser.parse_args())
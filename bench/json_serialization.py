@@ -0,0 +1,126 @@
+"""Microbenchmark: JSON serialization of posts, doubts and exam results payloads.
+
+    python bench/json_serialization.py --size 1000 --repeat 20
+
+Builds documents shaped like the ones the routes read from MongoDB (ObjectId _ids,
+datetime fields, a few KB of text per post, 50-answer results) and times three ways of
+turning a list of them into a response body:
+
+  loop+json   the old way: convert _id and dates per document in Python, then Flask's
+              default provider (json.dumps, sorted keys)
+  orjson      OrjsonProvider.dumps on the raw documents (what jsonify does now)
+  streamed    json_provider.stream_array over the raw documents (array_response)
+
+Reports the median time per payload and the speed-up over the old way.
+"""
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from json_provider import OrjsonProvider, stream_array  # noqa: E402
+
+WORDS = "lecture notes assignment exam syllabus chapter solution doubt please explain question answer".split()
+
+
+def text(words):
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def make_posts(n):
+    start = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "courseCode": f"CS{random.randint(100, 499)}",
+        "courseName": text(3),
+        "title": text(6),
+        "description": text(60),
+        "fileName": "notes.pdf",
+        "fileKey": os.urandom(32).hex(),
+        "fileSize": random.randint(10_000, 50_000_000),
+        "fileType": "application/pdf",
+        "postDate": start + timedelta(minutes=i)
+    } for i in range(n)]
+
+
+def make_doubts(n):
+    start = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "courseCode": "CS401",
+        "username": f"student{random.randint(1, 500)}",
+        "role": "student",
+        "message": text(25),
+        "timestamp": start + timedelta(seconds=30 * i)
+    } for i in range(n)]
+
+
+def make_results(n, questions=50):
+    start = datetime(2024, 1, 1, 9)
+    return [{
+        "_id": ObjectId(),
+        "examId": "65f0c0ffee0000000000beef",
+        "studentUsername": f"student{i}",
+        "status": "completed",
+        "score": random.randint(0, questions),
+        "total": questions,
+        "answers": [random.randint(-1, 3) for _ in range(questions)],
+        "started_at": start,
+        "submitted_at": start + timedelta(minutes=random.randint(10, 60))
+    } for i in range(n)]
+
+
+def old_loop(docs):
+    # What get_posts/get_doubts/get_exam_results used to do before jsonify
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+        for key, value in doc.items():
+            if isinstance(value, datetime):
+                doc[key] = value.isoformat()
+    return docs
+
+
+def timed(fn, payloads):
+    times = []
+    for docs in payloads:
+        started = time.perf_counter()
+        fn(docs)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main(args):
+    random.seed(1)
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+
+    datasets = [("posts", make_posts(args.size)), ("doubts", make_doubts(args.size * 2)), ("results", make_results(args.size))]
+    print(f"median of {args.repeat} runs per payload")
+    for name, docs in datasets:
+        # The old way mutates its input, so it gets a fresh copy every run (not timed)
+        copies = [copy.deepcopy(docs) for _ in range(args.repeat)]
+        old = timed(lambda d: default.dumps(old_loop(d)), copies)
+        new = timed(fast.dumps, [docs] * args.repeat)
+        streamed = timed(lambda d: b"".join(stream_array(d)), [docs] * args.repeat)
+        size = len(fast.dumps(docs))
+        print(f"{name:8} {len(docs):6} docs {size / 1024:8.0f} KB  "
+              f"loop+json {old * 1000:8.2f} ms  orjson {new * 1000:7.2f} ms ({old / new:5.1f}x)  "
+              f"streamed {streamed * 1000:7.2f} ms ({old / streamed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare JSON serialization of realistic response payloads")
+    parser.add_argument("--size", type=int, default=1000, help="posts and results per payload (doubts: twice as many)")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""Benchmark: login throughput and latency at different bcrypt cost factors.
+
+    python bench/login_throughput.py --rounds 10 11 12 13 --logins 200 --threads 100
+
+For every cost factor the script hashes one password, then runs the requested number of
+password checks from a pool of request threads (like gunicorn's gthread workers) through
+the same PasswordHasher the app uses. It reports logins per second, p50/p99 login latency,
+and how long a trivial request waits for the CPU while the logins run, which is what the
+hashing pool size trades against. Needs Flask-Bcrypt (already an app dependency).
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+from flask_bcrypt import Bcrypt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from passwords import HASH_POOL_SIZE, PasswordHasher  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def probe_latency(stop, samples):
+    # A request that needs almost no CPU: how long does it take to get scheduled?
+    while not stop.is_set():
+        started = time.perf_counter()
+        sum(range(1000))
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.005)
+
+
+def bench(bcrypt, rounds, args):
+    hasher = PasswordHasher(bcrypt, rounds=rounds, pool_size=args.pool_size)
+    pw_hash = hasher.hash("correct horse battery staple")
+
+    latencies, probe = [], []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe_latency, args=(stop, probe), daemon=True)
+    prober.start()
+
+    def login(_):
+        started = time.perf_counter()
+        assert hasher.check(pw_hash, "correct horse battery staple")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    print(f"rounds={rounds:2}  {args.logins / elapsed:8.1f} logins/s  "
+          f"p50 {statistics.median(latencies) * 1000:8.1f} ms  p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+          f"other-request p99 {percentile(probe, 99) * 1000:6.2f} ms")
+
+
+def main(args):
+    bcrypt = Bcrypt(Flask(__name__))
+    print(f"{args.logins} logins from {args.threads} request threads, hashing pool of {args.pool_size}")
+    for rounds in args.rounds:
+        bench(bcrypt, rounds, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure login throughput at different bcrypt cost factors")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=100, help="concurrent request threads")
+    parser.add_argument("--pool-size", type=int, default=HASH_POOL_SIZE, help="hashing pool size")
+    main(parser.parse_args())
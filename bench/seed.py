@@ -0,0 +1,181 @@
+"""Seed a local database with realistic data for the load tests.
+
+    python bench/seed.py --mongo-uri mongodb://127.0.0.1:27017 --students 20000 --courses 500
+
+Creates students and teachers (all approved, all with the password given by --password),
+student profiles with roll numbers, courses whose rosters carry long embedded
+students[].attendance arrays, a doubts and posts history per course, and a few exams per
+course with some completed results. Every run starts from empty collections in --db, and
+the app's indexes are created afterwards.
+
+The collections are dropped first, so only local servers are accepted unless
+--allow-remote is given. bench/api_load.py calls seed() itself; this script is for
+seeding a database that a separately started server will use.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from indexes import ensure_indexes  # noqa: E402
+
+COLLECTIONS = ["users", "profiles", "courses", "posts", "doubts", "doubt_deletions", "post_versions",
+               "exams", "exam_results", "attendance"]
+WORDS = ("lecture notes assignment exam syllabus chapter solution doubt please explain question answer "
+         "theorem proof example tutorial lab deadline marks").split()
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def add_arguments(parser):
+    parser.add_argument("--db", default="vssut_platform", help="database name (the app's DB_NAME)")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--roster", type=int, default=60, help="students per course")
+    parser.add_argument("--lectures", type=int, default=120, help="lecture dates per course")
+    parser.add_argument("--doubts", type=int, default=100, help="chat messages per course")
+    parser.add_argument("--posts", type=int, default=20, help="posts per course")
+    parser.add_argument("--exams", type=int, default=3, help="exams per course")
+    parser.add_argument("--questions", type=int, default=20, help="questions per exam")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the one hash all users share")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, so runs are comparable")
+
+
+def check_local(uri, allow_remote):
+    if allow_remote:
+        return
+    host = urlparse(uri).hostname or ""
+    if uri.startswith("mongodb+srv://") or host not in LOCAL_HOSTS:
+        sys.exit(f"Refusing to drop collections on {host or uri}: pass --allow-remote if you mean it")
+
+
+def text(words):
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def student_name(n):
+    return f"student{n}"
+
+
+def roll_number(n):
+    return str(2100000000 + n)
+
+
+def lecture_dates(count):
+    start = datetime(2024, 7, 1)
+    # Newest first, the order attend_teach.html keeps them in
+    return [f"{d.day}/{d.month}" for d in (start + timedelta(days=2 * i) for i in reversed(range(count)))]
+
+
+def seed(db, args):
+    # Returns a summary the load test uses to pick its virtual users
+    random.seed(args.seed)
+    for name in COLLECTIONS:
+        db[name].drop()
+
+    import bcrypt
+    pw_hash = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt(args.bcrypt_rounds)).decode("utf-8")
+
+    students = [student_name(n) for n in range(args.students)]
+    teachers = [f"teacher{n}" for n in range(args.teachers)]
+    db.users.insert_many(
+        [{"username": u, "password": pw_hash, "userType": "student", "approved": True} for u in students]
+        + [{"username": u, "password": pw_hash, "userType": "teacher", "approved": True} for u in teachers]
+    )
+    db.profiles.insert_many([
+        {"username": student_name(n), "rollNumber": roll_number(n), "name": f"Student {n}",
+         "institution": "VSSUT", "degree": "B.Tech", "branch": "CSE"}
+        for n in range(args.students)
+    ])
+
+    dates = lecture_dates(args.lectures)
+    courses = []
+    for c in range(args.courses):
+        code = f"BENCH{c:03d}"
+        enrolled = random.sample(range(args.students), min(args.roster, args.students))
+        courses.append({
+            "courseCode": code,
+            "name": f"{text(2).title()} {c}",
+            "creator": teachers[c % len(teachers)],
+            "lectureDates": dates,
+            "students": [
+                {"rollNumber": roll_number(n), "name": f"Student {n}",
+                 "attendance": [1 if random.random() < 0.8 else 0 for _ in dates]}
+                for n in enrolled
+            ],
+            "studentCount": len(enrolled),
+            "attendanceVersion": 0,
+        })
+    db.courses.insert_many(courses)
+
+    now = datetime.now()
+    for course in courses:
+        code = course["courseCode"]
+        members = [student_name(int(s["rollNumber"]) - 2100000000) for s in course["students"]]
+        if args.doubts:
+            db.doubts.insert_many([
+                {"courseCode": code, "username": random.choice(members) if i % 4 else course["creator"],
+                 "role": "student" if i % 4 else "teacher", "message": text(random.randint(5, 40)),
+                 "timestamp": now - timedelta(minutes=10 * (args.doubts - i))}
+                for i in range(args.doubts)
+            ])
+        if args.posts:
+            db.posts.insert_many([
+                {"courseCode": code, "courseName": course["name"], "title": text(5), "description": text(40),
+                 "fileName": "notes.pdf", "fileKey": os.urandom(32).hex(), "fileSize": random.randint(10 ** 4, 10 ** 7),
+                 "fileType": "application/pdf", "postDate": now - timedelta(days=args.posts - i)}
+                for i in range(args.posts)
+            ])
+        for e in range(args.exams):
+            exam_id = ObjectId()
+            key = [random.randint(0, 3) for _ in range(args.questions)]
+            db.exams.insert_one({
+                "_id": exam_id, "courseCode": code, "title": f"Quiz {e + 1}", "creator": course["creator"],
+                "questions": [{"question": text(12), "options": [text(3) for _ in range(4)], "correctOption": k}
+                              for k in key],
+                "created_at": now - timedelta(days=30 - e),
+            })
+            # The first exam of each course is already taken by half of the class
+            if e == 0 and members:
+                takers = members[:len(members) // 2]
+                db.exam_results.insert_many([
+                    {"examId": str(exam_id), "studentUsername": u, "status": "completed",
+                     "score": random.randint(0, args.questions), "total": args.questions,
+                     "answers": [random.randint(-1, 3) for _ in key],
+                     "started_at": now - timedelta(days=1), "submitted_at": now - timedelta(days=1)}
+                    for u in takers
+                ])
+
+    problems = ensure_indexes(db)
+    return {
+        "students": students,
+        "teachers": teachers,
+        "courses": {c["courseCode"]: c["creator"] for c in courses},
+        "indexProblems": problems,
+    }
+
+
+def main(args):
+    from pymongo import MongoClient
+
+    check_local(args.mongo_uri, args.allow_remote)
+    summary = seed(MongoClient(args.mongo_uri)[args.db], args)
+    for problem in summary["indexProblems"]:
+        print(f"❌ {problem}")
+    print(f"✅ Seeded {len(summary['students'])} students, {len(summary['teachers'])} teachers and "
+          f"{len(summary['courses'])} courses into {args.db}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a local MongoDB with realistic data for load tests")
+    parser.add_argument("--mongo-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--allow-remote", action="store_true", help="allow a non-local server (its data is dropped)")
+    add_arguments(parser)
+    main(parser.parse_args())
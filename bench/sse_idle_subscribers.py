@@ -0,0 +1,133 @@
+"""Load test: how many idle push subscribers one worker can hold.
+
+Start one worker with the shipped settings, for example
+
+    WEB_CONCURRENCY=1 gunicorn app:app -c gunicorn.conf.py -b 127.0.0.1:5000
+
+against a database seeded by bench/seed.py, then run
+
+    python bench/sse_idle_subscribers.py --clients 1000 --course BENCH001
+
+The script opens the requested number of /api/stream/<course> connections and keeps them
+idle. While they are held it times /api/health and a login, which must stay fast: streams
+past the worker's cap (MAX_STREAMS, by default half of the gthread threads) are turned
+away with a retry: hint instead of taking the threads everything else needs. Then it logs
+in as a teacher, posts one message into the course and measures how long the broadcast
+takes to reach every held subscriber. Only the standard library is used.
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+
+
+async def subscribe(host, port, course, connected, received, delivered_at, turned_away):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return None
+    writer.write(f"GET /api/stream/{course} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        status = await reader.readline()
+        if b" 200 " not in status:
+            writer.close()
+            return None
+        while True:
+            line = await reader.readline()
+            if not line:
+                return writer
+            if line.strip() == b"retry: 3000":
+                connected.release()
+            elif line.startswith(b"retry:"):
+                # Turned away at the stream cap
+                turned_away.append(1)
+            elif line.strip() == b"event: doubt":
+                delivered_at.append(time.perf_counter())
+                received.release()
+    except (ConnectionError, asyncio.CancelledError):
+        return writer
+
+
+def http(method, url, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=data, method=method, headers=headers)
+    with urllib.request.urlopen(req, timeout=30) as res:
+        return json.loads(res.read() or b"null")
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+async def main(args):
+    base = f"http://{args.host}:{args.port}"
+    connected = asyncio.Semaphore(0)
+    received = asyncio.Semaphore(0)
+    delivered_at = []
+    turned_away = []
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(subscribe(args.host, args.port, args.course, connected, received, delivered_at, turned_away))
+             for _ in range(args.clients)]
+
+    held = 0
+    deadline = time.perf_counter() + args.connect_timeout
+    while held < args.clients and time.perf_counter() < deadline:
+        try:
+            await asyncio.wait_for(connected.acquire(), timeout=max(0.01, deadline - time.perf_counter()))
+            held += 1
+        except asyncio.TimeoutError:
+            break
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(args.idle)
+    print(f"subscribers held: {held}/{args.clients} (connected in {connect_seconds:.2f}s), "
+          f"turned away at the cap: {len(turned_away)}")
+    stats = await asyncio.to_thread(http, "GET", f"{base}/api/stream/stats")
+    print(f"worker {stats['pid']}: {stats['subscribers']} subscribers on {stats['topics']} topics, "
+          f"cap {stats.get('maxStreams')}, bridge={stats['bridge']}")
+
+    _, health_ms = await asyncio.to_thread(timed, http, "GET", f"{base}/api/health")
+    login, login_ms = await asyncio.to_thread(timed, http, "POST", f"{base}/api/login", {
+        "username": args.username, "password": args.password, "userType": "teacher"
+    })
+    print(f"while held: /api/health {health_ms:.1f} ms, login {login_ms:.1f} ms")
+
+    sent = time.perf_counter()
+    await asyncio.to_thread(http, "POST", f"{base}/api/doubts", {"courseCode": args.course, "message": "fan-out probe"},
+                            login["token"])
+    got = 0
+    while got < held:
+        try:
+            await asyncio.wait_for(received.acquire(), timeout=args.connect_timeout)
+            got += 1
+        except asyncio.TimeoutError:
+            break
+    if delivered_at:
+        latencies = sorted(t - sent for t in delivered_at)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"broadcast delivered to {got}/{held}: p50 {p50:.1f} ms, p99 {p99:.1f} ms, last {latencies[-1] * 1000:.1f} ms")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--course", default="BENCH001")
+    parser.add_argument("--username", default="teacher0", help="teacher who posts the probe (bench/seed.py user)")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds to hold the idle connections")
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
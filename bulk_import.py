@@ -0,0 +1,271 @@
+import csv
+import json
+from itertools import islice
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import attendance_store
+
+# Bulk onboarding from CSV or JSON Lines: users with their profiles, approvals and course
+# rosters. Records are read from the upload stream one at a time and written in batches
+# of IMPORT_BATCH_SIZE, so a file with thousands of students is a few dozen round trips.
+#
+# Every import is idempotent: users that already exist and roll numbers that are already
+# enrolled are skipped (without hashing their password again or touching their profile),
+# so after a partial failure the same file can simply be sent again. ?startRow= skips the
+# rows a previous run already reported as done.
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ROWS = 1000
+USER_TYPES = ("student", "teacher", "admin")
+USER_FIELDS = ("username", "password", "userType", "approved")
+
+
+class ImportReport:
+    def __init__(self):
+        self.counts = {"created": 0, "updated": 0, "skipped": 0, "failed": 0}
+        self.rows = []
+        self.last_row = 0
+
+    def add(self, row, status, message=None, **fields):
+        self.counts[status] += 1
+        self.last_row = max(self.last_row, row)
+        # Per-row details only for rows that need attention
+        if status in ("skipped", "failed") and len(self.rows) < MAX_REPORTED_ROWS:
+            self.rows.append({"row": row, "status": status, "message": message, **fields})
+
+    def to_dict(self):
+        return {**self.counts, "lastRow": self.last_row, "rows": sorted(self.rows, key=lambda r: r["row"])}
+
+
+def read_records(stream, fmt):
+    # Yields (row number, dict), or (row number, None) for a line that could not be parsed.
+    # Row numbers count data rows from 1, which is what ?startRow= refers to.
+    lines = (line.decode("utf-8-sig") if isinstance(line, bytes) else line for line in stream)
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(lines), start=1):
+            yield number, {k.strip(): (v or "").strip() for k, v in record.items() if k}
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def batches(records, start_row=1, size=IMPORT_BATCH_SIZE):
+    records = ((n, r) for n, r in records if n >= start_row)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _truthy(value, default):
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def import_users(users_collection, profiles_collection, hasher, records, report, start_row=1):
+    # Columns username, password, userType (default student), approved (default true);
+    # every other column goes into the user's profile. Only users created by this run get
+    # a profile: an existing account is skipped whole, never overwritten. Returns the
+    # usernames and the profile roll numbers written, for cache invalidation.
+    touched, rolls = [], set()
+    for batch in batches(records, start_row):
+        valid = []
+        for row, record in batch:
+            if record is None:
+                report.add(row, "failed", "Could not parse this row")
+                continue
+            username = str(record.get("username") or "").strip()
+            user_type = record.get("userType") or "student"
+            if not username or not record.get("password"):
+                report.add(row, "failed", "username and password are required", username=username)
+            elif user_type not in USER_TYPES:
+                report.add(row, "failed", f"userType must be one of {', '.join(USER_TYPES)}", username=username)
+            else:
+                valid.append((row, username, user_type, record, _profile_of(record)))
+
+        existing = {u["username"] for u in users_collection.find(
+            {"username": {"$in": [v[1] for v in valid]}}, {"username": 1, "_id": 0}
+        )}
+        taken = {p["rollNumber"] for p in profiles_collection.find(
+            {"rollNumber": {"$in": [v[4]["rollNumber"] for v in valid if "rollNumber" in v[4]]}},
+            {"rollNumber": 1, "_id": 0}
+        )}
+        seen = set()
+        new = []
+        for row, username, user_type, record, profile in valid:
+            roll = profile.get("rollNumber")
+            if username in existing or username in seen:
+                report.add(row, "skipped", "User already exists", username=username)
+            elif roll is not None and roll in taken:
+                report.add(row, "failed", "Roll number already belongs to another student",
+                           username=username, rollNumber=roll)
+            else:
+                new.append((row, username, user_type, record, profile))
+                if roll is not None:
+                    taken.add(roll)
+            seen.add(username)
+
+        # Only new users cost a bcrypt hash, and those run in parallel on the hashing pool
+        hashes = hasher.hash_many([str(record["password"]) for _, _, _, record, _ in new])
+        docs = [
+            {"username": username, "password": pw_hash, "userType": user_type,
+             "approved": _truthy(record.get("approved"), True)}
+            for (_, username, user_type, record, _), pw_hash in zip(new, hashes)
+        ]
+        failed = set()
+        if docs:
+            try:
+                users_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # A concurrent import or signup took the name in between
+                for err in e.details.get("writeErrors", []):
+                    failed.add(err["index"])
+        created = []
+        for index, entry in enumerate(new):
+            if index in failed:
+                report.add(entry[0], "skipped", "User already exists", username=entry[1])
+            else:
+                created.append(entry)
+
+        # Profiles of the users just created; the unique roll number index settles a race
+        # with a profile saved in the meantime
+        with_profile = [entry for entry in created if entry[4]]
+        lost = set()
+        if with_profile:
+            try:
+                profiles_collection.bulk_write(
+                    [UpdateOne({"username": username}, {"$set": profile}, upsert=True)
+                     for _, username, _, _, profile in with_profile],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                for err in e.details.get("writeErrors", []):
+                    lost.add(with_profile[err["index"]][0])
+        for row, username, _, _, profile in created:
+            touched.append(username)
+            if row in lost:
+                report.add(row, "failed", "User created, but the roll number was taken meanwhile",
+                           username=username, rollNumber=profile.get("rollNumber"))
+                continue
+            if "rollNumber" in profile:
+                rolls.add(profile["rollNumber"])
+            report.add(row, "created")
+    return touched, rolls
+
+
+def _profile_of(record):
+    # Every column that is not part of the account; roll numbers are always strings
+    profile = {k: v for k, v in record.items()
+               if k not in USER_FIELDS and k != "_id" and not k.startswith("$") and "." not in k
+               and v not in (None, "")}
+    if "rollNumber" in profile:
+        profile["rollNumber"] = str(profile["rollNumber"]).strip()
+        if not profile["rollNumber"]:
+            del profile["rollNumber"]
+    return profile
+
+
+def approve_users(users_collection, usernames, report):
+    # usernames: iterable of (row number, username); returns the usernames approved
+    approved = []
+    for batch in batches(usernames):
+        names = [name for _, name in batch if name]
+        found = {u["username"] for u in users_collection.find({"username": {"$in": names}}, {"username": 1, "_id": 0})}
+        users_collection.update_many({"username": {"$in": list(found)}}, {"$set": {"approved": True}})
+        for row, name in batch:
+            if name in found:
+                report.add(row, "updated")
+                approved.append(name)
+            else:
+                report.add(row, "failed", "No such user", username=name)
+    return approved
+
+
+def _stored_forms(roll):
+    # The roll number as the app writes it, and as a number the way older rosters kept it
+    forms = [roll]
+    if roll.isdigit() and str(int(roll)) == roll:
+        forms.append(int(roll))
+    return forms
+
+
+def import_rosters(courses_collection, records, report, start_row=1):
+    # Columns courseCode, rollNumber and optionally name. Returns the course codes changed.
+    # Courses still on the embedded attendance layout get a zeroed attendance array, guarded
+    # by the number of lectures so a lecture added meanwhile is reported instead of skewed.
+    touched = set()
+    for batch in batches(records, start_row):
+        codes = list({str(r.get("courseCode") or "").strip() for _, r in batch if r})
+        courses = {c["courseCode"]: c for c in courses_collection.find(
+            {"courseCode": {"$in": codes}},
+            {"courseCode": 1, "lectureDates": 1, "attendanceStore": 1, "students.rollNumber": 1, "_id": 0}
+        )}
+        # Compared through roll_key: older rosters may still hold roll numbers as numbers
+        enrolled = {code: {attendance_store.roll_key(s.get("rollNumber")) for s in c.get("students", [])}
+                    for code, c in courses.items()}
+
+        ops, pending = [], []
+        for row, record in batch:
+            if record is None:
+                report.add(row, "failed", "Could not parse this row")
+                continue
+            code = str(record.get("courseCode") or "").strip()
+            roll = attendance_store.roll_key(record.get("rollNumber") or "")
+            if not code or not roll:
+                report.add(row, "failed", "courseCode and rollNumber are required")
+                continue
+            course = courses.get(code)
+            if not course:
+                report.add(row, "failed", "No such course", courseCode=code, rollNumber=roll)
+                continue
+            if roll in enrolled[code]:
+                report.add(row, "skipped", "Already enrolled", courseCode=code, rollNumber=roll)
+                continue
+            enrolled[code].add(roll)
+
+            student = {"rollNumber": roll, "name": record.get("name") or ""}
+            query = {"courseCode": code, "students.rollNumber": {"$nin": _stored_forms(roll)}}
+            if not attendance_store.is_migrated(course):
+                lectures = len(course.get("lectureDates", []))
+                student["attendance"] = [0] * lectures
+                query["lectureDates"] = {"$size": lectures}
+            ops.append(UpdateOne(query, {
+                "$push": {"students": student},
+                "$inc": {"studentCount": 1, "attendanceVersion": 1}
+            }))
+            pending.append((row, code, roll))
+
+        if ops:
+            # Older courses have no studentCount; $inc would start it at 1 however long the
+            # roster already is, so count the roster into it first
+            courses_collection.update_many(
+                {"courseCode": {"$in": list({p[1] for p in pending})}, "studentCount": {"$exists": False}},
+                [{"$set": {"studentCount": {"$size": {"$ifNull": ["$students", []]}}}}]
+            )
+            courses_collection.bulk_write(ops, ordered=False)
+            # bulk_write only reports totals, so check which roll numbers actually landed
+            now = {c["courseCode"]: {attendance_store.roll_key(s.get("rollNumber")) for s in c.get("students", [])} for c in courses_collection.find(
+                {"courseCode": {"$in": list({p[1] for p in pending})}}, {"courseCode": 1, "students.rollNumber": 1, "_id": 0}
+            )}
+            for row, code, roll in pending:
+                if roll in now.get(code, ()):
+                    report.add(row, "created")
+                    touched.add(code)
+                else:
+                    report.add(row, "failed", "Course changed during the import, send the file again",
+                               courseCode=code, rollNumber=roll)
+    return touched
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# In-process caches shared by the request threads of one worker, and the application
+# cache layer (profiles, users, course metadata) that can also live in Redis.
+#
+# A Cache is one namespace ("profile", "course", ...) inside a backend. The in-process
+# backend is an LRUCache; RedisBackend speaks to anything Redis-compatible and is shared
+# by all workers, so explicit invalidations are seen everywhere at once. With the
+# in-process backend another worker can serve a stale entry until its TTL runs out.
+
+CACHE_MAX_ENTRIES = 10000
+CACHE_TTL = 30
+
+MISSING = object()
+
+
+class LRUCache:
+    # Thread-safe mapping that forgets the least recently used entry once full;
+    # entries set with a ttl also expire after that many seconds
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = MISSING
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    # Same get/set/pop interface as LRUCache, values stored as JSON with a key prefix.
+    # Takes any client with redis-py's get/set/delete (redis.Redis, fakeredis, ...).
+    def __init__(self, client, prefix="vssut:"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix="vssut:"):
+        import redis  # optional dependency, only needed for CACHE_BACKEND=redis
+
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key, default=None):
+        raw = self._client.get(self._prefix + key)
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, json.dumps(value, default=str), ex=ttl or None)
+
+    def pop(self, key):
+        self._client.delete(self._prefix + key)
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class Cache:
+    # One namespace in a backend, read through a loader; None results are cached too,
+    # so repeated lookups of something that does not exist stay cheap
+    def __init__(self, name, backend, ttl=CACHE_TTL):
+        self.name = name
+        self._backend = backend
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key, loader):
+        value = self._backend.get(f"{self.name}:{key}", MISSING)
+        if value is not MISSING:
+            self._count("hits")
+            return value
+        self._count("misses")
+        value = loader(key)
+        self._backend.set(f"{self.name}:{key}", value, self._ttl)
+        return value
+
+    def invalidate(self, *keys):
+        for key in keys:
+            if key is not None:
+                self._backend.pop(f"{self.name}:{key}")
+                self._count("invalidations")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def backend_from_env():
+    # CACHE_BACKEND=memory (default, per worker) or redis with REDIS_URL
+    if os.environ.get("CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+    return LRUCache(int(os.environ.get("CACHE_MAX_ENTRIES", CACHE_MAX_ENTRIES)))
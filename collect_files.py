@@ -0,0 +1,26 @@
+"""Remove stored upload files that no post has used for a while.
+
+    python collect_files.py [--grace-hours 24] [--dry-run]
+
+Deleting a post only lowers the file's reference count (see FileRefs in storage.py), so
+run this now and then, e.g. from a daily scheduler. Safe while the app is serving
+traffic: a file is only removed after it stayed unused for the whole grace period, and an
+upload of the same bytes racing the removal is refused instead of losing its file.
+"""
+import argparse
+
+from app import file_refs, file_storage
+from storage import FILE_GRACE_SECONDS
+
+
+def main(args):
+    removed = file_refs.collect(file_storage, grace_seconds=int(args.grace_hours * 3600), dry_run=args.dry_run)
+    verb = "would remove" if args.dry_run else "removed"
+    print(f"✅ {verb} {len(removed)} unused files")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove stored upload files no post uses any more")
+    parser.add_argument("--grace-hours", type=float, default=FILE_GRACE_SECONDS / 3600, help="keep unused files at least this long")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be removed without deleting")
+    main(parser.parse_args())
@@ -0,0 +1,50 @@
+"""Create the first admin account, or approve an existing account as admin.
+
+    python create_admin.py --username principal
+    python create_admin.py --username principal --promote
+
+Public signup cannot create admins and unapproved admins cannot log in, so a fresh
+installation gets its first admin from here; every later one can be added from the admin
+page. The password is asked for on the terminal. With --promote an existing account
+becomes an approved admin and keeps its password.
+"""
+import argparse
+import getpass
+
+from pymongo.errors import DuplicateKeyError
+
+from app import password_hasher, user_state_cache, users_collection
+
+
+def main(args):
+    if args.promote:
+        result = users_collection.update_one(
+            {"username": args.username}, {"$set": {"userType": "admin", "approved": True}}
+        )
+        if not result.matched_count:
+            print(f"❌ No user named {args.username}")
+            return
+    else:
+        password = getpass.getpass("Password: ")
+        if not password or password != getpass.getpass("Repeat password: "):
+            print("❌ Passwords are empty or do not match")
+            return
+        try:
+            users_collection.insert_one({
+                "username": args.username,
+                "password": password_hasher.hash(password),
+                "userType": "admin",
+                "approved": True
+            })
+        except DuplicateKeyError:
+            print(f"❌ {args.username} already exists, use --promote to make it an admin")
+            return
+    user_state_cache.invalidate(args.username)
+    print(f"✅ {args.username} is an approved admin")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or approve an admin account")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--promote", action="store_true", help="make an existing account an approved admin")
+    main(parser.parse_args())
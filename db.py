@@ -0,0 +1,161 @@
+import os
+import threading
+
+import pymongo
+from pymongo import MongoClient, ReadPreference
+from pymongo.collection import Collection
+from pymongo.read_preferences import SecondaryPreferred
+
+# The MongoDB connection: one MongoClient per process, created on first use.
+#
+# A MongoClient must not cross a fork(): its pooled sockets and monitor threads belong to
+# the process that made it. Gunicorn with preload_app imports the app in the master and
+# forks the workers afterwards, so nothing connects at import time; each process builds
+# its own client the first time it touches the database. The app keeps module-level
+# names like users_collection, which are proxies that find the current process's
+# collection on every use.
+#
+# Settings come from the environment:
+#   MONGO_URI                           connection string
+#   DB_NAME                             database name
+#   MONGO_MAX_POOL_SIZE                 connections per worker process (pymongo default: 100)
+#   MONGO_MIN_POOL_SIZE                 connections kept open while idle (default: 0)
+#   MONGO_WAIT_QUEUE_TIMEOUT_MS         how long a request waits for a free connection
+#   MONGO_CONNECT_TIMEOUT_MS            TCP connect and TLS handshake
+#   MONGO_SOCKET_TIMEOUT_MS             one command's round trip
+#   MONGO_SERVER_SELECTION_TIMEOUT_MS   how long a command waits for a usable server (default: 30000)
+#   MONGO_SECONDARY_READS=1             listing reads go to secondaries when there are any
+#   MONGO_MAX_STALENESS_SECONDS         skip secondaries lagging more than this (at least 90)
+#
+# Unset settings keep pymongo's defaults.
+
+DEFAULT_URI = "mongodb://localhost:27017"
+DEFAULT_DB_NAME = "vssut_platform"
+HEALTH_TIMEOUT_MS = 2000
+
+_CLIENT_OPTIONS = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+}
+
+
+def options_from_env(environ=os.environ):
+    return {option: int(environ[name]) for option, name in _CLIENT_OPTIONS.items() if environ.get(name)}
+
+
+class Mongo:
+    def __init__(self, uri, db_name, secondary_reads=False, max_staleness=None, event_listeners=(), **options):
+        self.uri = uri
+        self.db_name = db_name
+        self._options = dict(options, event_listeners=list(event_listeners))
+        # Listing routes may be served a few seconds behind the primary; everything that
+        # reads its own writes (logins, attendance saves, the doubts cursor) stays on it
+        if secondary_reads:
+            self._listing_preference = SecondaryPreferred(max_staleness=max_staleness or -1)
+        else:
+            self._listing_preference = ReadPreference.PRIMARY
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_pid = None
+        self._collections = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(before=self._close_client, after_in_child=self._forget_client)
+
+    @classmethod
+    def from_env(cls, environ=os.environ, **kwargs):
+        uri = environ.get("MONGO_URI")
+        if not uri:
+            print(f"❌ MONGO_URI is not set, using {DEFAULT_URI}")
+        staleness = environ.get("MONGO_MAX_STALENESS_SECONDS")
+        return cls(
+            uri or DEFAULT_URI,
+            environ.get("DB_NAME", DEFAULT_DB_NAME),
+            secondary_reads=environ.get("MONGO_SECONDARY_READS") == "1",
+            max_staleness=int(staleness) if staleness else None,
+            **kwargs,
+            **options_from_env(environ)
+        )
+
+    def _close_client(self):
+        # A preloading master only used its client for the startup setup. Its monitor
+        # threads would be copied into the workers half-alive, so it is closed before the
+        # fork; the master opens a new one if it needs the database again.
+        if self._client is not None and self._client_pid == os.getpid():
+            self._client.close()
+            self._client = None
+            self._client_pid = None
+            self._collections = {}
+
+    def _forget_client(self):
+        # Another thread may have held the lock at fork time, and the client (if any)
+        # belongs to the parent
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_pid = None
+        self._collections = {}
+
+    def client(self):
+        if self._client_pid == os.getpid():
+            return self._client
+        with self._lock:
+            if self._client_pid != os.getpid():
+                self._collections = {}
+                self._client = MongoClient(self.uri, **self._options)
+                self._client_pid = os.getpid()
+        return self._client
+
+    def database(self):
+        return self.client()[self.db_name]
+
+    def _collection(self, name, listing):
+        client = self.client()
+        collection = self._collections.get((name, listing))
+        if collection is None:
+            database = client[self.db_name]
+            collection = database.get_collection(name, read_preference=self._listing_preference) if listing else database[name]
+            self._collections[(name, listing)] = collection
+        return collection
+
+    def collection(self, name, listing=False):
+        # listing=True: reads that tolerate replication lag (admin lists, exports, exam
+        # analysis). They only leave the primary with MONGO_SECONDARY_READS=1.
+        return CollectionProxy(lambda: self._collection(name, listing))
+
+    def db(self):
+        return DatabaseProxy(self)
+
+    def ping(self, timeout_ms=HEALTH_TIMEOUT_MS):
+        # Raises if the server does not answer within timeout_ms, however long the
+        # client's own server selection timeout is
+        with pymongo.timeout(timeout_ms / 1000):
+            self.client().admin.command("ping")
+
+
+class CollectionProxy:
+    # Forwards everything to the current process's Collection
+    def __init__(self, resolve):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+class DatabaseProxy:
+    # For code that is handed the database (index setup, the push bridge): collections
+    # it keeps are proxies too, so they still work after a fork
+    def __init__(self, mongo):
+        self._mongo = mongo
+
+    def __getattr__(self, name):
+        value = getattr(self._mongo.database(), name)
+        return self._mongo.collection(name) if isinstance(value, Collection) else value
+
+    def __getitem__(self, name):
+        return self._mongo.collection(name)
@@ -0,0 +1,118 @@
+import numpy as np
+from pymongo import UpdateMany
+
+from exam_results import COMPLETED
+
+# Grading and item analysis on a students x questions matrix of chosen option indices.
+# -1 means the question was left unanswered; an answer key cell that is not a valid
+# option is stored as -2 so it never matches anything.
+
+UNANSWERED = -1
+NO_KEY = -2
+# Share of students at each end used for the discrimination index (Kelley's 27%)
+DISCRIMINATION_GROUP = 0.27
+
+
+def answer_vector(values, length, fill=UNANSWERED):
+    # Client or stored answers -> int vector of exactly `length` cells
+    vector = np.full(length, fill, dtype=np.int16)
+    for i, value in enumerate((values or [])[:length]):
+        if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < 256:
+            vector[i] = value
+    return vector
+
+
+def key_vector(answer_key):
+    return answer_vector(list(answer_key), len(answer_key), fill=NO_KEY)
+
+
+def grade(key, answers):
+    # key is a key_vector, answers anything the client sent; returns (score, stored answers)
+    vector = answer_vector(answers, len(key))
+    return int(np.count_nonzero(vector == key)), vector.tolist()
+
+
+def answer_matrix(results, questions):
+    # Completed attempts that kept their answers -> (usernames, students x questions matrix)
+    rows = [r for r in results if r.get("status") == COMPLETED and r.get("answers") is not None]
+    matrix = np.full((len(rows), questions), UNANSWERED, dtype=np.int16)
+    for i, row in enumerate(rows):
+        matrix[i] = answer_vector(row["answers"], questions)
+    return [r["studentUsername"] for r in rows], matrix
+
+
+def item_analysis(key, matrix, options):
+    students, questions = matrix.shape
+    correct = matrix == key
+    scores = correct.sum(axis=1)
+
+    # Option-choice counts for every question in one bincount: column 0 is "unanswered"
+    if matrix.size:
+        options = max(options, int(matrix.max()) + 1)
+    width = options + 1
+    cells = (matrix + 1) + np.arange(questions) * width
+    choices = np.bincount(cells.ravel(), minlength=questions * width).reshape(questions, width)
+
+    difficulty = correct.mean(axis=0) if students else np.zeros(questions)
+    group = max(1, int(round(students * DISCRIMINATION_GROUP))) if students else 0
+    if students >= 2:
+        # Share correct among the top scorers minus share correct among the bottom scorers
+        order = np.argsort(scores, kind="stable")
+        discrimination = correct[order[-group:]].mean(axis=0) - correct[order[:group]].mean(axis=0)
+    else:
+        discrimination = np.zeros(questions)
+
+    return {
+        "students": students,
+        "questions": questions,
+        "scores": {
+            "mean": round(float(scores.mean()), 2) if students else 0,
+            "median": float(np.median(scores)) if students else 0,
+            "std": round(float(scores.std()), 2) if students else 0,
+            "min": int(scores.min()) if students else 0,
+            "max": int(scores.max()) if students else 0,
+            # distribution[s] = how many students scored s
+            "distribution": np.bincount(scores, minlength=questions + 1).tolist()
+        },
+        "items": [
+            {
+                "question": q,
+                "correctOption": int(key[q]) if key[q] >= 0 else None,
+                "difficulty": round(float(difficulty[q]), 3),
+                "discrimination": round(float(discrimination[q]), 3),
+                "unanswered": int(choices[q, 0]),
+                "optionCounts": choices[q, 1:].tolist()
+            }
+            for q in range(questions)
+        ]
+    }
+
+
+def regrade(results_collection, exam_id, key):
+    # Re-scores every completed attempt from its stored answers. Students are grouped by
+    # new score, so the write is one bulk_write of at most len(key) + 1 update_many ops.
+    results = list(results_collection.find(
+        {"examId": exam_id, "status": COMPLETED},
+        {"_id": 1, "studentUsername": 1, "status": 1, "answers": 1, "score": 1}
+    ))
+    usernames, matrix = answer_matrix(results, len(key))
+    scores = (matrix == key).sum(axis=1) if len(usernames) else np.zeros(0, dtype=int)
+    ids = {r["studentUsername"]: r["_id"] for r in results}
+    previous = {r["studentUsername"]: r.get("score") for r in results}
+
+    by_score = {}
+    for username, score in zip(usernames, scores.tolist()):
+        if previous[username] != score:
+            by_score.setdefault(score, []).append(ids[username])
+    if by_score:
+        results_collection.bulk_write([
+            UpdateMany({"_id": {"$in": changed}}, {"$set": {"score": score, "total": len(key)}})
+            for score, changed in by_score.items()
+        ], ordered=False)
+
+    return {
+        "regraded": len(usernames),
+        "changed": sum(len(changed) for changed in by_score.values()),
+        # Submitted before answers were stored, so their score cannot be recomputed
+        "skipped": len(results) - len(usernames)
+    }
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from bson import ObjectId
+
+from cache import LRUCache
+from exam_analytics import key_vector
+
+# Exams as they are delivered and graded, kept per worker.
+#
+# Each entry holds the student-facing paper already serialized to JSON (questions and
+# options, never the correct answers) and the answer key as a NumPy vector, so opening an exam and
+# grading a burst of submissions do not go back to Mongo for every student. Entries
+# are dropped when the exam changes in this worker and expire after EXAM_CACHE_TTL
+# seconds, which bounds how long another worker can serve an outdated paper. Answer keys
+# are not left to the TTL: every fix bumps the exam's keyVersion, and for_grading()
+# compares it with the cached entry's before a submission is scored.
+
+EXAM_CACHE_SIZE = 256
+EXAM_CACHE_TTL = 60
+
+CachedExam = namedtuple("CachedExam", ["exam_id", "course_code", "paper", "answer_key", "key_version", "loaded_at"])
+
+
+def build_entry(exam):
+    exam_id = str(exam["_id"])
+    questions = exam.get("questions", [])
+    paper = json.dumps({
+        "_id": exam_id,
+        "title": exam.get("title"),
+        "courseCode": exam.get("courseCode"),
+        "creator": exam.get("creator"),
+        "questions": [{"text": q.get("text"), "options": q.get("options", [])} for q in questions]
+    }).encode("utf-8")
+    answer_key = key_vector([q.get("correctOption") for q in questions])
+    return CachedExam(exam_id, exam.get("courseCode"), paper, answer_key, exam.get("keyVersion", 0), time.monotonic())
+
+
+class ExamCache:
+    def __init__(self, exams_collection, max_entries=EXAM_CACHE_SIZE, ttl=EXAM_CACHE_TTL):
+        self._exams = exams_collection
+        self._entries = LRUCache(max_entries)
+        self._ttl = ttl
+        # exam id -> [lock, number of requests holding or waiting for it]
+        self._loading = {}
+        self._loading_guard = threading.Lock()
+
+    def get(self, exam_id):
+        # Returns a CachedExam, or None if the id is invalid or the exam does not exist
+        entry = self._fresh(exam_id)
+        if entry:
+            return entry
+        # One loader per exam, so a burst of misses for the same exam is a single read
+        # while other exams load in parallel
+        with self._load_lock(exam_id):
+            entry = self._fresh(exam_id)
+            if entry:
+                return entry
+            try:
+                exam = self._exams.find_one({"_id": ObjectId(exam_id)})
+            except Exception:
+                return None
+            if not exam:
+                return None
+            entry = build_entry(exam)
+            self._entries.set(exam_id, entry)
+            return entry
+
+    def for_grading(self, exam_id):
+        # Like get(), but the answer key is known to be current: one _id lookup of the
+        # exam's keyVersion, and a reload when a regrade in any worker has changed it
+        entry = self.get(exam_id)
+        if not entry:
+            return None
+        current = self._exams.find_one({"_id": ObjectId(exam_id)}, {"keyVersion": 1})
+        if not current:
+            self.invalidate(exam_id)
+            return None
+        if current.get("keyVersion", 0) != entry.key_version:
+            self.invalidate(exam_id)
+            return self.get(exam_id)
+        return entry
+
+    @contextmanager
+    def _load_lock(self, exam_id):
+        with self._loading_guard:
+            slot = self._loading.setdefault(exam_id, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._loading_guard:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._loading[exam_id]
+
+    def invalidate(self, exam_id):
+        self._entries.pop(str(exam_id))
+
+    def _fresh(self, exam_id):
+        entry = self._entries.get(exam_id)
+        if entry and time.monotonic() - entry.loaded_at < self._ttl:
+            return entry
+        return None
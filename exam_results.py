@@ -0,0 +1,143 @@
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# Exam attempts as a small state machine, one row per (examId, studentUsername):
+#
+#   new (no row) --start--> in-progress --submit--> completed
+#        |                       |
+#        +--------submit---------+      in-progress --lock--> locked
+#
+# Every transition is a single conditional write, and the unique index on
+# (examId, studentUsername) turns "the row is already past this state" into a duplicate
+# key error instead of a second row. Nothing reads the row first, so two requests for the
+# same student racing each other cannot both win, and a locked attempt can never be
+# overwritten by a late submit. Lock is the one plain update: there is nothing to lock
+# before a start, so it must not create a row.
+
+NEW, IN_PROGRESS, COMPLETED, LOCKED = "new", "in-progress", "completed", "locked"
+
+BATCH_MAX_OPS = 500
+BATCH_WINDOW_SECONDS = 0.02
+
+
+def start_op(exam_id, username):
+    # Only inserts; an existing row in any state makes this a duplicate key
+    return (
+        {"examId": exam_id, "studentUsername": username, "status": {"$exists": False}},
+        {"$setOnInsert": {"status": IN_PROGRESS, "score": 0, "started_at": datetime.now()}}
+    )
+
+
+def submit_op(exam_id, username, fields):
+    # new or in-progress -> completed; completed/locked rows do not match and the upsert collides
+    return (
+        {"examId": exam_id, "studentUsername": username, "status": IN_PROGRESS},
+        {"$set": {"status": COMPLETED, **fields}}
+    )
+
+
+def lock_op(exam_id, username):
+    # in-progress -> locked; applied without upsert, so anything else simply does not match
+    return (
+        {"examId": exam_id, "studentUsername": username, "status": IN_PROGRESS},
+        {"$set": {"status": LOCKED, "locked_at": datetime.now()}}
+    )
+
+
+class ExamResults:
+    def __init__(self, results_collection, batch_writes=False):
+        self._results = results_collection
+        self._writer = BatchWriter(results_collection) if batch_writes else None
+
+    def start(self, exam_id, username):
+        return self._apply(start_op(exam_id, username))
+
+    def submit(self, exam_id, username, score, total, **extra):
+        fields = {"score": score, "total": total, "submitted_at": datetime.now(), **extra}
+        return self._apply(submit_op(exam_id, username, fields))
+
+    def lock(self, exam_id, username):
+        # Not batched: a lock is rare, and a bulk_write cannot tell which update matched
+        query, update = lock_op(exam_id, username)
+        return self._results.update_one(query, update).matched_count > 0
+
+    def reset(self, exam_id, username):
+        # Teacher override: back to "new" from any state
+        return self._results.delete_one({"examId": exam_id, "studentUsername": username}).deleted_count > 0
+
+    def _apply(self, op):
+        # True when the transition happened, False when the attempt was in the wrong state.
+        # start and submit are upserts, so "wrong state" always shows up as a duplicate key.
+        if self._writer:
+            return self._writer.submit(op).result()
+        query, update = op
+        try:
+            self._results.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            return False
+        return True
+
+
+class BatchWriter:
+    # Collects result writes from concurrent requests and sends them as one unordered
+    # bulk_write. Each caller waits on its own future. Since every op is an upsert, an op
+    # lost its race exactly when it shows up as a duplicate key in the write errors.
+
+    def __init__(self, results_collection, max_ops=BATCH_MAX_OPS, window=BATCH_WINDOW_SECONDS):
+        self._results = results_collection
+        self._queue = queue.Queue()
+        self._max_ops = max_ops
+        self._window = window
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, op):
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _ensure_thread(self):
+        # Started on first use so it also exists in forked gunicorn workers
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="exam-results-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self._max_ops:
+                    batch.append(self._queue.get(timeout=self._window))
+            except queue.Empty:
+                pass
+            self._flush(batch)
+
+    def _flush(self, batch):
+        lost, error = set(), None
+        try:
+            self._results.bulk_write([UpdateOne(q, u, upsert=True) for (q, u), _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                if err.get("code") == 11000:
+                    lost.add(err["index"])
+                else:
+                    error = error or Exception(err.get("errmsg", "bulk write failed"))
+        except Exception as e:
+            error = e
+
+        for index, (_, future) in enumerate(batch):
+            if index in lost:
+                future.set_result(False)
+            elif error:
+                future.set_exception(error)
+            else:
+                future.set_result(True)
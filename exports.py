@@ -0,0 +1,170 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from itertools import chain
+from xml.sax.saxutils import escape
+
+# Streaming spreadsheet exports. A sheet is (title, header, rows) where rows is any
+# iterable, typically a generator over a Mongo cursor; the writers below turn a sequence
+# of sheets into an iterable of byte chunks for a streamed Flask Response, so memory use
+# does not grow with the number of students, lectures or courses.
+#
+# XLSX is written by hand (inline strings, one part per sheet) into a zip file that is
+# never seeked, so it streams the same way CSV does. CSV has no sheets: each one is its
+# own block with its header row (and optionally a title row), separated by an empty line.
+
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# XML 1.0 has no representation for most control characters
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_INVALID_TITLE = re.compile(r"[\[\]:*?/\\]")
+# Spreadsheet apps run a CSV cell starting with one of these as a formula
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+
+
+def stream(fmt, sheets, titled=False):
+    # titled: in CSV, put each sheet's title on its own row above the header
+    return _xlsx_chunks(sheets) if fmt == "xlsx" else _csv_chunks(sheets, titled)
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return str(value)
+
+
+def _csv_cell(value):
+    # Text from users (names, titles, answers) is quoted with a leading ' so it is never
+    # evaluated; numbers are left alone, a negative score is not a formula
+    text = _cell_text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_START):
+        return "'" + text
+    return text
+
+
+def _csv_chunks(sheets, titled=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, so Excel opens the file as UTF-8 instead of the local code page
+    buffer.write("\ufeff")
+    for index, (title, header, rows) in enumerate(sheets):
+        if index:
+            writer.writerow([])
+        if titled:
+            writer.writerow([_csv_cell(title)])
+        for row in chain([header], rows):
+            writer.writerow([_csv_cell(v) for v in row])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _Chunks:
+    # Write-only file object for ZipFile: no tell()/seek(), so entries get data descriptors
+    # and nothing is ever rewritten; what was written so far is collected with take()
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts, self.size = [], 0
+        return data
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = _cell_text(value)
+    if not text:
+        return "<c/>"
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_INVALID_XML.sub("", text))}</t></is></c>'
+
+
+def _sheet_title(title, used):
+    # Excel: at most 31 characters, none of []:*?/\ and unique within the workbook
+    base = _INVALID_TITLE.sub("_", str(title or "Sheet"))[:31] or "Sheet"
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base[:31 - len(str(n)) - 1]}-{n}"
+    used.add(name.lower())
+    return name
+
+
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = "</sheetData></worksheet>"
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _xlsx_chunks(sheets):
+    out = _Chunks()
+    titles, used = [], set()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for index, (title, header, rows) in enumerate(sheets, start=1):
+            titles.append(_sheet_title(title, used))
+            with zf.open(f"xl/worksheets/sheet{index}.xml", "w", force_zip64=True) as part:
+                part.write(_SHEET_HEAD.encode("utf-8"))
+                for row in chain([header], rows):
+                    part.write(("<row>" + "".join(_xlsx_cell(v) for v in row) + "</row>").encode("utf-8"))
+                    if out.size >= CHUNK_SIZE:
+                        yield out.take()
+                part.write(_SHEET_TAIL.encode("utf-8"))
+        if not titles:
+            # A workbook needs at least one sheet
+            titles.append("Sheet1")
+            zf.writestr("xl/worksheets/sheet1.xml", _SHEET_HEAD + _SHEET_TAIL)
+
+        count = range(1, len(titles) + 1)
+        zf.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in count)
+            + "</Types>"
+        ))
+        zf.writestr("_rels/.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{_NS_PKG_REL}">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ))
+        zf.writestr("xl/workbook.xml", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>'
+            + "".join(f'<sheet name="{escape(t, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                      for i, t in zip(count, titles))
+            + "</sheets></workbook>"
+        ))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{_NS_PKG_REL}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                      for i in count)
+            + "</Relationships>"
+        ))
+    yield out.take()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+
+import metrics_files
+
+# Gunicorn settings, all overridable from the environment (the Procfile passes this file).
+#
+# WEB_WORKER_CLASS picks how a worker serves concurrent requests:
+#   gthread (default)  GUNICORN_THREADS threads per worker (default 100). Every open
+#                      request holds a thread, SSE streams included, so a worker keeps at
+#                      most half of its threads as streams (MAX_STREAMS, see push_hub.py).
+#   gevent             one greenlet per request, up to GUNICORN_WORKER_CONNECTIONS per
+#                      worker (default 1000). Waiting on MongoDB, storage or an idle event
+#                      stream costs a greenlet instead of a thread, so the I/O-bound
+#                      routes (posts, doubts polling, the /api/stream event streams) scale
+#                      much further. Needs the gevent package. bcrypt still runs on native
+#                      threads, see passwords.py.
+#
+# WEB_CONCURRENCY sets the number of worker processes (gunicorn's default: 1).
+# WEB_PRELOAD=1 imports the app once in the master before forking (gthread only: a gevent
+# worker has to monkey-patch before the app is imported, so it loads the app itself). The
+# MongoDB client is created per worker after the fork either way, see db.py.
+#
+# METRICS_DIR is where the workers share their /metrics snapshots (see metrics.py). It is
+# emptied when the server starts, so it must not be shared with another server; left
+# unset, every server run gets its own temporary directory, removed again on shutdown.
+
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+threads = int(os.environ.get("GUNICORN_THREADS", "100"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+preload_app = os.environ.get("WEB_PRELOAD") == "1" and worker_class != "gevent"
+
+if not os.environ.get("METRICS_DIR"):
+    # Set in the master's environment, so every worker inherits it
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="app-metrics-")
+    _own_metrics_dir = True
+else:
+    _own_metrics_dir = False
+
+
+def on_starting(server):
+    metrics_files.clear(os.environ["METRICS_DIR"])
+
+
+def child_exit(server, worker):
+    metrics_files.retire_worker(os.environ["METRICS_DIR"], worker.pid)
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
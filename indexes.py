@@ -0,0 +1,171 @@
+"""Declare, create and audit every index the app relies on.
+
+    python indexes.py           # create missing indexes (also runs at app startup)
+    python indexes.py --audit   # explain each route's query shape, fail on a COLLSCAN
+
+Creating is idempotent: an index that already exists with the same keys and options is
+left alone. Names are MongoDB's defaults, so indexes created by hand earlier count too.
+A unique index that cannot be built because the collection already holds duplicates is
+reported and skipped, so the app still starts; clean up the duplicates and run this again.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ExecutionTimeout, OperationFailure
+
+# Deletion tombstones for the doubts chat only need to outlive a polling client's cursor
+DOUBT_DELETIONS_TTL_SECONDS = 24 * 60 * 60
+
+INDEXES = {
+    "users": [
+        # signup/add_user rely on this instead of a racy find_one check
+        IndexModel([("username", ASCENDING)], unique=True),
+        # Admin user listing filtered by role, paged by username
+        IndexModel([("userType", ASCENDING), ("username", ASCENDING)]),
+    ],
+    "profiles": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        # A roll number belongs to one student; profiles without one (teachers) are left out
+        IndexModel([("rollNumber", ASCENDING)], name="rollNumber_unique", unique=True,
+                   partialFilterExpression={"rollNumber": {"$gt": ""}}),
+    ],
+    "courses": [
+        IndexModel([("courseCode", ASCENDING)], unique=True),
+        # Multikey: "which courses is this roll number enrolled in" is an index seek
+        IndexModel([("students.rollNumber", ASCENDING)]),
+        IndexModel([("creator", ASCENDING)]),
+    ],
+    "posts": [
+        IndexModel([("courseCode", ASCENDING), ("postDate", DESCENDING), ("_id", DESCENDING)]),
+        # collect_files.py checks whether any post still uses a stored file
+        IndexModel([("fileKey", ASCENDING)], sparse=True),
+    ],
+    "file_refs": [
+        IndexModel([("refs", ASCENDING), ("releasedAt", ASCENDING)]),
+    ],
+    "doubts": [
+        IndexModel([("courseCode", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "doubt_deletions": [
+        IndexModel([("courseCode", ASCENDING), ("deletedAt", ASCENDING)]),
+        IndexModel([("deletedAt", ASCENDING)], expireAfterSeconds=DOUBT_DELETIONS_TTL_SECONDS),
+    ],
+    "attendance": [
+        IndexModel([("courseCode", ASCENDING), ("rollNumber", ASCENDING), ("lectureDate", ASCENDING)], unique=True),
+        IndexModel([("courseCode", ASCENDING), ("lectureDate", ASCENDING)]),
+        IndexModel([("rollNumber", ASCENDING), ("courseCode", ASCENDING)]),
+    ],
+    "exams": [
+        IndexModel([("creator", ASCENDING)]),
+        IndexModel([("courseCode", ASCENDING)]),
+    ],
+    "exam_results": [
+        # One result row per student per exam; the state machine in exam_results.py depends on it
+        IndexModel([("examId", ASCENDING), ("studentUsername", ASCENDING)], unique=True),
+    ],
+}
+
+# (route, collection, filter, sort) for every query the routes send with a filter.
+# Whole-collection listings (unfiltered admin user list and feeds, user counts) are not included.
+_ID = ObjectId("0" * 24)
+_NOW = datetime(2024, 1, 1)
+QUERY_SHAPES = [
+    ("signup/login", "users", {"username": "u", "userType": "student"}, None),
+    ("approve/delete user", "users", {"_id": _ID}, None),
+    ("admin users page", "users", {"userType": "student", "username": {"$gt": "u"}}, [("username", 1)]),
+    ("admin users search", "users", {"approved": {"$ne": True}, "username": {"$regex": "^u"}}, [("username", 1)]),
+    ("profile", "profiles", {"username": "u"}, None),
+    ("profile by roll", "profiles", {"rollNumber": "r"}, None),
+    ("courses for teacher", "courses", {"creator": "u"}, None),
+    ("courses for student", "courses", {"students.rollNumber": "r"}, None),
+    ("course by code", "courses", {"courseCode": "C"}, None),
+    ("attendance sheet", "attendance", {"courseCode": "C", "present": 1}, None),
+    ("attendance column", "attendance", {"courseCode": "C", "lectureDate": "1/1", "present": 1}, None),
+    ("attendance export", "attendance", {"courseCode": "C", "present": 1, "rollNumber": {"$in": ["r"]}}, None),
+    ("department courses", "courses", {"courseCode": {"$regex": "^CS"}}, None),
+    ("student attendance", "attendance", {"rollNumber": "r", "courseCode": {"$in": ["C"]}, "present": 1}, None),
+    ("posts feed", "posts", {"courseCode": {"$in": ["C", "D"]}}, [("postDate", -1), ("_id", -1)]),
+    ("posts feed page", "posts",
+     {"courseCode": {"$in": ["C"]}, "$or": [{"postDate": {"$lt": _NOW}}, {"postDate": _NOW, "_id": {"$lt": _ID}}]},
+     [("postDate", -1), ("_id", -1)]),
+    ("post file refs", "posts", {"fileKey": "k"}, None),
+    ("post versions", "post_versions", {"_id": {"$in": ["C"]}}, None),
+    ("unused files", "file_refs", {"refs": 0, "releasedAt": {"$lt": _NOW}}, None),
+    ("doubts page", "doubts", {"courseCode": "C"}, [("timestamp", -1), ("_id", -1)]),
+    ("doubts since", "doubts",
+     {"courseCode": "C", "$or": [{"timestamp": {"$gt": _NOW}}, {"timestamp": _NOW, "_id": {"$gt": _ID}},
+                             {"timestamp": {"$gte": _NOW}}]},
+     [("timestamp", 1), ("_id", 1)]),
+    ("doubt deletions", "doubt_deletions", {"courseCode": "C", "deletedAt": {"$gte": _NOW}}, None),
+    ("exams for teacher", "exams", {"creator": "u"}, None),
+    ("exams for student", "exams", {"courseCode": {"$in": ["C"]}}, None),
+    ("exam paper", "exams", {"_id": _ID}, None),
+    ("exam status", "exam_results", {"examId": "e", "studentUsername": "u"}, None),
+    ("exam results", "exam_results", {"examId": "e"}, None),
+    ("student exam statuses", "exam_results", {"studentUsername": "u", "examId": {"$in": ["e"]}}, None),
+]
+
+
+def ensure_indexes(db):
+    # Returns a list of problems; an empty list means every declared index exists
+    problems = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                db[collection].create_indexes([model])
+            except ExecutionTimeout:
+                # Out of time (a readiness probe's budget), not a broken index: try again later
+                raise
+            except OperationFailure as e:
+                problems.append(f"{collection}.{model.document['name']}: {e}")
+    return problems
+
+
+def _stages(plan):
+    # Every stage name in a (possibly nested) winning plan
+    yield plan.get("stage")
+    for child in [plan.get("inputStage"), plan.get("queryPlan")] + plan.get("inputStages", []):
+        if child:
+            yield from _stages(child)
+
+
+def audit(db):
+    # Returns [(route, collection, stages)] for every shape whose winning plan scans the collection
+    failures = []
+    for route, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = [s for s in _stages(plan) if s]
+        if "COLLSCAN" in stages:
+            failures.append((route, collection, stages))
+    return failures
+
+
+def main(args):
+    from app import db
+
+    problems = ensure_indexes(db)
+    for problem in problems:
+        print(f"❌ {problem}")
+    print(f"✅ {sum(len(m) for m in INDEXES.values()) - len(problems)} indexes in place")
+
+    if args.audit:
+        failures = audit(db)
+        for route, collection, stages in failures:
+            print(f"❌ {route}: COLLSCAN on {collection} ({' <- '.join(stages)})")
+        print(f"{'❌' if failures else '✅'} {len(QUERY_SHAPES) - len(failures)}/{len(QUERY_SHAPES)} query shapes use an index")
+        if failures:
+            sys.exit(1)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the app's MongoDB indexes and audit its query plans")
+    parser.add_argument("--audit", action="store_true", help="explain every route's query shape and fail on a COLLSCAN")
+    main(parser.parse_args())
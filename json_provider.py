@@ -0,0 +1,62 @@
+import orjson
+from bson import ObjectId
+from flask import Response
+from flask.json.provider import JSONProvider
+
+# Every JSON body the app sends (jsonify, the SSE stream, request parsing) goes through
+# orjson. Mongo documents can be returned as they come from the driver: ObjectId becomes
+# its hex string and datetimes are written natively as ISO 8601, the same text
+# datetime.isoformat() gives for the naive timestamps we store, so routes no longer
+# convert _id and dates field by field.
+#
+# Keys are not sorted (Flask's default provider sorts them); nothing depends on the order.
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Streamed arrays are sent in chunks of about this many bytes
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    # bytes, ready for a response body
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skips the bytes -> str -> bytes round trip the base class would make
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+
+def stream_array(items):
+    # A JSON array written element by element, so a cursor is never turned into a list
+    buffer = bytearray(b"[")
+    first = True
+    for item in items:
+        if not first:
+            buffer += b","
+        buffer += dumps(item)
+        first = False
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+def array_response(items):
+    return Response(stream_array(items), mimetype=OrjsonProvider.mimetype)
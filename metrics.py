@@ -0,0 +1,234 @@
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from pymongo import monitoring
+
+import metrics_files
+
+# Request and MongoDB command metrics in the Prometheus text format.
+#
+# Each worker process records into its own Registry (a lock and a few dict updates per
+# request or command). Gunicorn runs several workers and a scrape reaches only one of
+# them, so every worker also writes a snapshot of its registry to METRICS_DIR every
+# SNAPSHOT_SECONDS and /metrics adds up the snapshots of all workers. Counters and
+# histograms of workers that exited are kept, so totals never go backwards; gauges only
+# count for workers whose snapshot is recent.
+#
+# METRICS_DIR must belong to one server: gunicorn.conf.py creates a fresh one when it is
+# not set, empties it on start and retires exited workers' files (metrics_files.py). A
+# process started without it (flask run) gets a private temporary directory.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+SNAPSHOT_SECONDS = 5
+SLOW_QUERY_MS = 100
+
+HELP = {
+    "http_requests_total": ("counter", "HTTP requests by route, method and status"),
+    "http_request_duration_seconds": ("histogram", "Time until the response object was ready (streams: until the first byte)"),
+    "http_response_size_bytes": ("histogram", "Response body size, when it is known up front"),
+    "http_requests_in_flight": ("gauge", "Requests being handled, including open streams"),
+    "mongo_command_duration_seconds": ("histogram", "MongoDB command latency by collection and command"),
+    "mongo_command_failures_total": ("counter", "MongoDB commands that failed"),
+    "mongo_documents_returned_total": ("counter", "Documents returned in find/aggregate/getMore batches"),
+    "mongo_slow_commands_total": ("counter", "MongoDB commands slower than the slow-query threshold"),
+}
+
+
+class Registry:
+    def __init__(self, directory=None, interval=SNAPSHOT_SECONDS):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._buckets = {}
+        self.directory = directory or tempfile.mkdtemp(prefix="app-metrics-")
+        self._interval = interval
+        self._writer_pid = None
+
+    # --- Recording ---
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add(self, name, labels, delta):
+        key = (name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name, labels, value, buckets):
+        # Per bucket (not cumulative) counts plus one overflow cell, then sum and count
+        key = (name, labels)
+        with self._lock:
+            cells = self._histograms.get(key)
+            if cells is None:
+                cells = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+                self._buckets[name] = buckets
+            cells[bisect_left(buckets, value)] += 1
+            cells[-2] += value
+            cells[-1] += 1
+        self._ensure_writer()
+
+    # --- Sharing between workers ---
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": time.time(),
+                "counters": [[n, list(l), v] for (n, l), v in self._counters.items()],
+                "gauges": [[n, list(l), v] for (n, l), v in self._gauges.items()],
+                "histograms": [[n, list(l), list(c)] for (n, l), c in self._histograms.items()],
+                "buckets": {n: list(b) for n, b in self._buckets.items()},
+            }
+
+    def _ensure_writer(self):
+        # Threads do not survive a fork, so start one per process on first use
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_snapshots, name="metrics-snapshot", daemon=True).start()
+
+    def _write_snapshots(self):
+        while True:
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"❌ Metrics snapshot failed: {e}")
+            time.sleep(self._interval)
+
+    def write_snapshot(self):
+        os.makedirs(self.directory, exist_ok=True)
+        metrics_files.write_snapshot(os.path.join(self.directory, f"{os.getpid()}.json"), self.snapshot())
+
+    def collect(self):
+        # This worker's live numbers plus the latest snapshot of every other worker
+        snapshots = [self.snapshot()]
+        for name in metrics_files.snapshot_files(self.directory, exclude=f"{os.getpid()}.json"):
+            snapshot = metrics_files.read_snapshot(os.path.join(self.directory, name))
+            if snapshot:
+                snapshots.append(snapshot)
+        return metrics_files.merge(snapshots, stale_after=self._interval * 3)
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render(collected):
+    counters, gauges, histograms, buckets = collected
+    series = {}
+    for (name, labels), value in counters.items():
+        series.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), value in gauges.items():
+        series.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), cells in sorted(histograms.items()):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(list(buckets[name]) + ["+Inf"], cells[:-2]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {cells[-2]}")
+        lines.append(f"{name}_count{_labels(labels)} {cells[-1]}")
+
+    out = []
+    for name in sorted(series):
+        kind, text = HELP.get(name, ("untyped", name))
+        # Histogram lines are already grouped per series with buckets in order
+        lines = series[name] if kind == "histogram" else sorted(series[name])
+        out += [f"# HELP {name} {text}", f"# TYPE {name} {kind}", *lines]
+    return "\n".join(out) + "\n"
+
+
+# --- Flask ---
+
+def instrument(app, registry):
+    # Route labels are URL rules ("/api/posts/<post_id>"), never raw paths, to keep the
+    # number of series bounded
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+        registry.add("http_requests_in_flight", (), 1)
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get("metrics_started")
+        if started is not None:
+            route = g.metrics_route
+            labels = (("route", route), ("method", request.method))
+            registry.observe("http_request_duration_seconds", labels, time.perf_counter() - started, LATENCY_BUCKETS)
+            registry.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+            if response.content_length is not None:
+                registry.observe("http_response_size_bytes", (("route", route),), response.content_length, SIZE_BUCKETS)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        # Runs when the body has been sent, so open event streams count as in flight
+        if g.pop("metrics_started", None) is not None:
+            registry.add("http_requests_in_flight", (), -1)
+
+
+# --- MongoDB ---
+
+def _collection(command_name, command):
+    target = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    return target if isinstance(target, str) else "-"
+
+
+def _shape(command):
+    # Field names only, never values, for the slow-query log
+    spec = command.get("filter") or command.get("q") or command.get("query")
+    if isinstance(spec, dict):
+        return "filter " + ",".join(sorted(spec))
+    pipeline = command.get("pipeline")
+    if isinstance(pipeline, list):
+        return "pipeline " + ",".join(next(iter(stage), "?") for stage in pipeline if isinstance(stage, dict))
+    return ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    # Pass to MongoClient(event_listeners=[...]); pymongo calls it on the thread that
+    # runs the command, so the cost is a dict insert and pop plus one histogram update
+    def __init__(self, registry, slow_ms=SLOW_QUERY_MS):
+        self._registry = registry
+        self._slow_seconds = slow_ms / 1000
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = (
+            _collection(event.command_name, event.command), event.command
+        )
+
+    def succeeded(self, event):
+        collection, command = self._pending.pop((event.connection_id, event.request_id), ("-", None))
+        labels = (("collection", collection), ("command", event.command_name))
+        seconds = event.duration_micros / 1e6
+        self._registry.observe("mongo_command_duration_seconds", labels, seconds, LATENCY_BUCKETS)
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch")) or []
+            self._registry.inc("mongo_documents_returned_total", labels, len(batch))
+        if seconds >= self._slow_seconds:
+            self._registry.inc("mongo_slow_commands_total", labels)
+            print(f"❌ Slow query: {event.command_name} on {collection} took {seconds * 1000:.0f} ms "
+                  f"{_shape(command or {})}")
+
+    def failed(self, event):
+        collection, _ = self._pending.pop((event.connection_id, event.request_id), ("-", None))
+        labels = (("collection", collection), ("command", event.command_name))
+        self._registry.observe("mongo_command_duration_seconds", labels, event.duration_micros / 1e6, LATENCY_BUCKETS)
+        self._registry.inc("mongo_command_failures_total", labels)
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+# The directory the workers' metrics snapshots are shared through (METRICS_DIR), see
+# metrics.py. Standard library only: the gunicorn master uses it from its server hooks
+# and must not import pymongo or the app before a gevent worker has monkey-patched.
+#
+# Every worker writes <pid>.json. When a worker exits, the master folds its counters and
+# histograms into EXITED_FILE and deletes its file, so totals never go backwards while the
+# directory stays one file per live worker.
+
+EXITED_FILE = "exited.json"
+
+
+def snapshot_files(directory, exclude=None):
+    try:
+        return [n for n in os.listdir(directory) if n.endswith(".json") and n != exclude]
+    except FileNotFoundError:
+        return []
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path, snapshot):
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+
+def merge(snapshots, stale_after):
+    now = time.time()
+    counters, gauges, histograms, buckets = {}, {}, {}, {}
+    for snap in snapshots:
+        buckets.update(snap["buckets"])
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        if now - snap["time"] <= stale_after:
+            for name, labels, value in snap["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, cells in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(cells))
+            for i, value in enumerate(cells):
+                total[i] += value
+    return counters, gauges, histograms, buckets
+
+
+def clear(directory):
+    # Server start: whatever a previous run left behind would be added to this one's totals
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            os.remove(os.path.join(directory, name))
+
+
+def retire_worker(directory, pid):
+    # Called by the master once a worker has exited; its gauges die with it
+    path = os.path.join(directory, f"{pid}.json")
+    snapshot = read_snapshot(path)
+    if snapshot is None:
+        return
+    exited_path = os.path.join(directory, EXITED_FILE)
+    snapshots = [s for s in (read_snapshot(exited_path), snapshot) if s]
+    counters, _, histograms, buckets = merge(snapshots, stale_after=0)
+    write_snapshot(exited_path, {
+        "time": time.time(),
+        "counters": [[n, [list(p) for p in l], v] for (n, l), v in counters.items()],
+        "gauges": [],
+        "histograms": [[n, [list(p) for p in l], c] for (n, l), c in histograms.items()],
+        "buckets": buckets,
+    })
+    os.remove(path)
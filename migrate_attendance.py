@@ -0,0 +1,130 @@
+"""Move embedded courses.students[].attendance arrays into the attendance collection.
+
+    python migrate_attendance.py [--batch-size 50] [--course CS401] [--dry-run]
+
+Safe to run while the app is serving traffic and safe to re-run: rows are upserted,
+and a course is only switched over if its attendanceVersion did not change while it
+was being copied (otherwise it is re-read and copied again).
+
+Afterwards roll numbers stored as numbers (in rosters, attendance rows and profiles) are
+rewritten as strings, which is how the app writes them; see attendance_store.roll_key.
+"""
+import argparse
+
+from pymongo.errors import DuplicateKeyError
+
+import attendance_store
+from app import attendance_collection, courses_collection, profiles_collection
+
+MAX_RETRIES = 3
+
+
+def migrate_course(course, dry_run=False):
+    code = course["courseCode"]
+    students = course.get("students", [])
+    lecture_dates = course.get("lectureDates", [])
+    if dry_run:
+        return sum(1 for _ in attendance_store.rows_from_students(code, students, lecture_dates))
+
+    # Diff against stored rows so a retry also clears cells unmarked since the last copy
+    written = attendance_store.replace_sheet(attendance_collection, code, students, lecture_dates)
+    version = course.get("attendanceVersion", 0)
+    result = courses_collection.update_one(
+        {
+            "_id": course["_id"],
+            "attendanceStore": {"$exists": False},
+            "attendanceVersion": version if version else {"$in": [0, None]}
+        },
+        {
+            "$set": {
+                "students": attendance_store.roster_of(students),
+                "studentCount": len(students),
+                "attendanceStore": attendance_store.ATTENDANCE_STORE
+            },
+            "$inc": {"attendanceVersion": 1}
+        }
+    )
+    return written if result.modified_count else None
+
+
+def normalize_roll_numbers(course_code=None, dry_run=False):
+    # Returns (courses, attendance rows, profiles) with numeric roll numbers
+    numeric = {"$type": "number"}
+    scope = {"courseCode": course_code} if course_code else {}
+    courses = list(courses_collection.find(
+        dict(scope, **{"students.rollNumber": numeric}), {"students": 1, "attendanceVersion": 1}
+    ))
+    rows = list(attendance_collection.find(dict(scope, rollNumber=numeric)))
+    profiles = [] if course_code else list(profiles_collection.find({"rollNumber": numeric}, {"username": 1, "rollNumber": 1}))
+    if dry_run:
+        return len(courses), len(rows), len(profiles)
+
+    for course in courses:
+        version = course.get("attendanceVersion", 0)
+        result = courses_collection.update_one(
+            {"_id": course["_id"], "attendanceVersion": version if version else {"$in": [0, None]}},
+            {"$set": {"students": attendance_store.normalize_students(course["students"])},
+             "$inc": {"attendanceVersion": 1}}
+        )
+        if not result.modified_count:
+            print(f"❌ {course.get('courseCode', course['_id'])}: changed meanwhile, run again later")
+    for row in rows:
+        # A string row for the same cell was written by the app after the number one
+        key = {"courseCode": row["courseCode"], "rollNumber": attendance_store.roll_key(row["rollNumber"]),
+               "lectureDate": row["lectureDate"]}
+        attendance_collection.update_one(key, {"$setOnInsert": {"present": row.get("present", 0)}}, upsert=True)
+        attendance_collection.delete_one({"_id": row["_id"]})
+    for profile in profiles:
+        try:
+            profiles_collection.update_one(
+                {"_id": profile["_id"]}, {"$set": {"rollNumber": attendance_store.roll_key(profile["rollNumber"])}}
+            )
+        except DuplicateKeyError:
+            print(f"❌ {profile['username']}: roll number {profile['rollNumber']} also belongs to another profile")
+    return len(courses), len(rows), len(profiles)
+
+
+def main(args):
+    query = {"attendanceStore": {"$exists": False}}
+    if args.course:
+        query["courseCode"] = args.course
+    projection = {"courseCode": 1, "students": 1, "lectureDates": 1, "attendanceVersion": 1}
+
+    migrated = rows = skipped = 0
+    last_id = None
+    while True:
+        batch_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        batch = list(courses_collection.find(batch_query, projection).sort("_id", 1).limit(args.batch_size))
+        if not batch:
+            break
+        for course in batch:
+            last_id = course["_id"]
+            for _ in range(MAX_RETRIES):
+                written = migrate_course(course, args.dry_run)
+                if written is not None:
+                    migrated += 1
+                    rows += written
+                    break
+                # Someone saved attendance meanwhile: take the fresh copy and try again
+                course = courses_collection.find_one(dict(query, _id=course["_id"]), projection)
+                if course is None:
+                    break
+            else:
+                skipped += 1
+                print(f"❌ {course['courseCode']}: kept changing during migration, run again later")
+        print(f"... {migrated} courses, {rows} attendance rows so far")
+
+    verb = "would migrate" if args.dry_run else "migrated"
+    print(f"✅ {verb} {migrated} courses ({rows} rows written), {skipped} skipped")
+
+    courses, rows, profiles = normalize_roll_numbers(args.course, args.dry_run)
+    verb = "would rewrite" if args.dry_run else "rewrote"
+    print(f"✅ {verb} numeric roll numbers in {courses} courses, {rows} attendance rows and {profiles} profiles")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded attendance arrays into the attendance collection")
+    parser.add_argument("--batch-size", type=int, default=50, help="courses loaded per query")
+    parser.add_argument("--course", help="only migrate this course code")
+    parser.add_argument("--dry-run", action="store_true", help="count rows without writing anything")
+    main(parser.parse_args())
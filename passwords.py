@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Password hashing off the request threads, and throttling of failed logins.
+#
+# bcrypt releases the GIL while it works, so a small thread pool is enough to keep
+# hashing parallel without letting a login rush occupy every gunicorn thread's CPU:
+# at most HASH_POOL_SIZE hashes run at once per worker and everything else (I/O-bound
+# routes, SSE streams) keeps getting scheduled.
+
+BCRYPT_ROUNDS = 12
+HASH_POOL_SIZE = os.cpu_count() or 2
+
+LOGIN_WINDOW_SECONDS = 15 * 60
+MAX_FAILURES_PER_USER = 10
+MAX_FAILURES_PER_IP = 50
+
+
+def hash_rounds(pw_hash):
+    # Cost factor of a "$2b$12$..." hash, or None if it is not a bcrypt hash
+    try:
+        return int(pw_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _executor(pool_size):
+    # Under gevent's monkey patching (gunicorn.conf.py, WEB_WORKER_CLASS=gevent) threads
+    # are greenlets, and a hash running in one would stall every request of the worker;
+    # gevent's own pool runs on native threads
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor(max_workers=pool_size)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bcrypt")
+
+
+class PasswordHasher:
+    def __init__(self, bcrypt, rounds=BCRYPT_ROUNDS, pool_size=HASH_POOL_SIZE):
+        self._bcrypt = bcrypt
+        self.rounds = rounds
+        self._pool = _executor(pool_size)
+
+    def hash(self, password):
+        return self._pool.submit(self._bcrypt.generate_password_hash, password, self.rounds).result().decode("utf-8")
+
+    def hash_many(self, passwords):
+        # Bulk imports: all of a batch's hashes queued on the pool at once, results in order
+        futures = [self._pool.submit(self._bcrypt.generate_password_hash, p, self.rounds) for p in passwords]
+        return [f.result().decode("utf-8") for f in futures]
+
+    def check(self, pw_hash, password):
+        try:
+            return self._pool.submit(self._bcrypt.check_password_hash, pw_hash, password).result()
+        except ValueError:
+            # Not a bcrypt hash at all
+            return False
+
+    def needs_rehash(self, pw_hash):
+        # Hashes made before BCRYPT_ROUNDS changed get upgraded at the next successful login
+        return hash_rounds(pw_hash) != self.rounds
+
+
+class LoginThrottle:
+    # Counts failed logins per username and per client IP in a fixed window, so a
+    # brute-force run is turned away before it costs a bcrypt check. Counters live in
+    # the cache backend: per worker with the in-process one, shared with Redis.
+    def __init__(self, backend, window=LOGIN_WINDOW_SECONDS,
+                 max_per_user=MAX_FAILURES_PER_USER, max_per_ip=MAX_FAILURES_PER_IP):
+        self._backend = backend
+        self._window = window
+        self._limits = {"user": max_per_user, "ip": max_per_ip}
+
+    def retry_after(self, username, ip):
+        # Seconds until a blocked username/IP may try again, or 0 if it is not blocked
+        wait = 0
+        for kind, key in (("user", username), ("ip", ip)):
+            count, started = self._backend.get(f"login_fail:{kind}:{key}") or (0, 0)
+            if count >= self._limits[kind]:
+                wait = max(wait, int(started + self._window - time.time()) + 1)
+        return wait
+
+    def failed(self, username, ip):
+        now = time.time()
+        for kind, key in (("user", username), ("ip", ip)):
+            count, started = self._backend.get(f"login_fail:{kind}:{key}") or (0, now)
+            remaining = started + self._window - now
+            if remaining <= 0:
+                count, started, remaining = 0, now, self._window
+            self._backend.set(f"login_fail:{kind}:{key}", (count + 1, started), int(remaining) + 1)
+
+    def succeeded(self, username):
+        self._backend.pop(f"login_fail:user:{username}")
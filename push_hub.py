@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo import CursorType
+
+import json_provider
+
+# Push channel for course events (doubts and posts).
+#
+# Every worker process keeps one topic per course. All clients of a course that are
+# connected to that worker wait on the same topic, so a new event is one broadcast
+# instead of one polling query per client. Events published by other gunicorn workers
+# reach this worker through a small capped collection that one thread per worker tails.
+
+EVENTS_COLLECTION_SIZE = 1024 * 1024  # bytes, the capped collection only has to hold recent events
+TOPIC_BACKLOG = 50
+HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = 300  # end each stream now and then, EventSource reconnects by itself
+STREAM_FULL_RETRY_MS = 30000  # how long a client turned away at the stream cap waits
+
+
+def max_streams_from_env(environ=os.environ):
+    # Open streams one worker holds at most. Under gthread each one occupies a thread for up
+    # to STREAM_MAX_SECONDS, so by default only half of the threads (the gunicorn.conf.py
+    # settings) may be streams and the rest stay free for logins, API calls and health
+    # checks. MAX_STREAMS overrides it.
+    if environ.get("MAX_STREAMS"):
+        return int(environ["MAX_STREAMS"])
+    if environ.get("WEB_WORKER_CLASS", "gthread") == "gevent":
+        return int(environ.get("GUNICORN_WORKER_CONNECTIONS", "1000")) // 2
+    return int(environ.get("GUNICORN_THREADS", "100")) // 2
+
+
+class Topic:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.events = deque(maxlen=TOPIC_BACKLOG)
+        self.subscribers = 0
+
+
+class PushHub:
+    def __init__(self, max_streams=None):
+        self._topics = {}
+        self._lock = threading.Lock()
+        # None: no cap
+        self.max_streams = max_streams
+        self._streams = 0
+        self._turned_away = 0
+        self._events_collection = None
+        self._bridge_pid = None
+        self._bridge_alive = False
+
+    def _topic(self, name):
+        with self._lock:
+            topic = self._topics.get(name)
+            if topic is None:
+                topic = self._topics[name] = Topic()
+            return topic
+
+    # --- Publishing ---
+
+    def publish_local(self, name, event):
+        # Deliver to the clients connected to this worker only
+        topic = self._topic(name)
+        with topic.cond:
+            topic.seq += 1
+            topic.events.append((topic.seq, event))
+            topic.cond.notify_all()
+
+    def broadcast(self, name, event_type, data):
+        # Deliver to every worker: through the capped collection when the bridge runs,
+        # otherwise straight to this worker's subscribers
+        event = {"type": event_type, "data": data}
+        self._ensure_bridge()
+        if self._bridge_alive:
+            try:
+                self._events_collection.insert_one({"topic": name, "event": json_provider.dumps(event).decode("utf-8")})
+                return
+            except Exception as e:
+                print(f"❌ Push bridge insert failed, delivering locally: {e}")
+        self.publish_local(name, event)
+
+    # --- Subscribing ---
+
+    def wait(self, name, after, timeout):
+        # Returns (latest seq, events newer than `after`), blocking until something arrives or timeout
+        topic = self._topic(name)
+        with topic.cond:
+            if topic.seq <= after:
+                topic.cond.wait(timeout)
+            return topic.seq, [event for seq, event in topic.events if seq > after]
+
+    def _claim_stream(self):
+        with self._lock:
+            if self.max_streams is not None and self._streams >= self.max_streams:
+                self._turned_away += 1
+                return False
+            self._streams += 1
+            return True
+
+    def stream(self, name):
+        # Server-sent events generator for one client. Past the cap the response only tells
+        # EventSource to come back in STREAM_FULL_RETRY_MS (a 200, since EventSource gives up
+        # for good on an error status); the pages poll while they wait.
+        if not self._claim_stream():
+            yield f"retry: {STREAM_FULL_RETRY_MS}\n\n"
+            return
+        try:
+            self._ensure_bridge()
+            topic = self._topic(name)
+            with topic.cond:
+                topic.subscribers += 1
+                after = topic.seq
+            started = time.monotonic()
+            try:
+                yield "retry: 3000\n\n"
+                while time.monotonic() - started < STREAM_MAX_SECONDS:
+                    after, events = self.wait(name, after, HEARTBEAT_SECONDS)
+                    if not events:
+                        yield ": keep-alive\n\n"
+                    for event in events:
+                        yield f"event: {event['type']}\ndata: {json_provider.dumps(event['data']).decode()}\n\n"
+            finally:
+                with topic.cond:
+                    topic.subscribers -= 1
+        finally:
+            with self._lock:
+                self._streams -= 1
+
+    def stats(self):
+        with self._lock:
+            topics = list(self._topics.items())
+        return {
+            "pid": os.getpid(),
+            "bridge": self._bridge_alive,
+            "topics": len(topics),
+            "subscribers": sum(topic.subscribers for _, topic in topics),
+            "streams": self._streams,
+            "maxStreams": self.max_streams,
+            "turnedAway": self._turned_away
+        }
+
+    # --- Cross-worker bridge ---
+
+    def init_bridge(self, db):
+        # Called once at startup; the tailing thread itself starts lazily in each worker
+        try:
+            if "push_events" not in db.list_collection_names():
+                db.create_collection("push_events", capped=True, size=EVENTS_COLLECTION_SIZE)
+            self._events_collection = db.push_events
+        except Exception as e:
+            print(f"❌ Push bridge unavailable, events stay inside each worker: {e}")
+
+    def _ensure_bridge(self):
+        # Threads do not survive a fork, so start one per process on first use
+        if self._events_collection is None or self._bridge_pid == os.getpid():
+            return
+        with self._lock:
+            if self._bridge_pid == os.getpid():
+                return
+            try:
+                last = self._events_collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+            except Exception as e:
+                print(f"❌ Push bridge unavailable, events stay inside this worker: {e}")
+                self._bridge_pid = os.getpid()
+                return
+            self._bridge_pid = os.getpid()
+            self._bridge_alive = True
+            last_id = last["_id"] if last else None
+            threading.Thread(target=self._tail_events, args=(last_id,), name="push-bridge", daemon=True).start()
+
+    def _tail_events(self, last_id):
+        while True:
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = self._events_collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                # The cursor follows insertion order while it stays open; the _id filter is
+                # only used to resume after it dies (e.g. while the collection is empty)
+                while cursor.alive:
+                    for doc in cursor:
+                        last_id = doc["_id"]
+                        self.publish_local(doc["topic"], json.loads(doc["event"]))
+                time.sleep(1)
+            except Exception as e:
+                print(f"❌ Push bridge error, retrying: {e}")
+                time.sleep(1)
+
+
+hub = PushHub(max_streams=max_streams_from_env())
@@ -0,0 +1,259 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+# Content-addressed file storage for uploaded course material.
+#
+# Every file is stored under the SHA-256 of its bytes, so two uploads of the same PDF
+# share one copy and a stored object never changes: the key doubles as a strong ETag and
+# downloads can be cached forever. Uploads are hashed and written in CHUNK_SIZE pieces
+# and abandoned as soon as they pass the size cap, so nothing is ever held in memory.
+#
+# LocalStorage keeps objects on disk; S3Storage talks to any S3-compatible server (MinIO
+# works) and needs boto3, which is not in requirements.txt: install it only where
+# FILE_STORAGE=s3 is used. storage_from_env() picks one from FILE_STORAGE.
+#
+# Since objects are shared, deleting a post never deletes one. FileRefs counts the posts
+# using each object, and collect_files.py removes objects that stayed unused for a while.
+
+CHUNK_SIZE = 1024 * 1024
+# How long an unused object is kept before collect_files.py may remove it
+FILE_GRACE_SECONDS = 24 * 60 * 60
+
+StoredFile = namedtuple("StoredFile", ["key", "size", "created"])
+FileInfo = namedtuple("FileInfo", ["size", "modified"])
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+def _copy_hashed(stream, out, max_bytes):
+    # stream -> out in chunks; returns (sha256 hex, size) or raises FileTooLarge
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return digest.hexdigest(), size
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise FileTooLarge(f"File is larger than {max_bytes} bytes")
+        digest.update(chunk)
+        out.write(chunk)
+
+
+def is_key(key):
+    return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
+
+
+class Storage(ABC):
+    # Backend interface used by the upload and download routes
+
+    @abstractmethod
+    def save(self, stream, max_bytes=None):
+        # Returns StoredFile; created is False when identical content was already stored
+        ...
+
+    @abstractmethod
+    def stat(self, key):
+        # FileInfo for a stored key, or None
+        ...
+
+    @abstractmethod
+    def open(self, key):
+        # Seekable binary file object positioned at the start
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        # Only collect_files.py deletes, see FileRefs
+        ...
+
+
+class LocalStorage(Storage):
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small: objects/ab/abcdef...
+        return os.path.join(self.root, "objects", key[:2], key)
+
+    def save(self, stream, max_bytes=None):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                key, size = _copy_hashed(stream, out, max_bytes)
+            path = self._path(key)
+            if os.path.exists(path):
+                return StoredFile(key, size, False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic, and harmless if a concurrent upload of the same bytes got there first
+            os.replace(tmp_path, path)
+            tmp_path = None
+            return StoredFile(key, size, True)
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except OSError:
+            return None
+        return FileInfo(st.st_size, datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class _S3Reader:
+    # Read-only seekable view of an S3 object; each read after a seek is one ranged GET,
+    # so a Range request only transfers the bytes it asks for
+    def __init__(self, client, bucket, key, size):
+        self._client, self._bucket, self._key, self._size = client, bucket, key, size
+        self._pos = 0
+        self._body = None
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self._size}[whence]
+        self._pos = base + offset
+        self.close()
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        if self._pos >= self._size:
+            return b""
+        if self._body is None:
+            response = self._client.get_object(Bucket=self._bucket, Key=self._key, Range=f"bytes={self._pos}-")
+            self._body = response["Body"]
+        data = self._body.read() if size is None or size < 0 else self._body.read(size)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+
+class S3Storage(Storage):
+    def __init__(self, bucket, endpoint_url=None, prefix="objects/"):
+        try:
+            import boto3  # optional dependency, only needed for FILE_STORAGE=s3
+        except ImportError:
+            raise RuntimeError("FILE_STORAGE=s3 needs boto3, which is not in requirements.txt: pip install boto3") from None
+
+        self._client = boto3.client("s3", endpoint_url=endpoint_url)
+        self._bucket = bucket
+        self._prefix = prefix
+
+    def save(self, stream, max_bytes=None):
+        # The key is only known once the whole upload is hashed, so spool it locally first
+        with tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE) as spool:
+            key, size = _copy_hashed(stream, spool, max_bytes)
+            if self.stat(key):
+                return StoredFile(key, size, False)
+            spool.seek(0)
+            self._client.upload_fileobj(spool, self._bucket, self._prefix + key)
+            return StoredFile(key, size, True)
+
+    def stat(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self._client.head_object(Bucket=self._bucket, Key=self._prefix + key)
+        except ClientError:
+            return None
+        return FileInfo(head["ContentLength"], head["LastModified"])
+
+    def open(self, key):
+        info = self.stat(key)
+        if info is None:
+            raise FileNotFoundError(key)
+        return _S3Reader(self._client, self._bucket, self._prefix + key, info.size)
+
+    def delete(self, key):
+        self._client.delete_object(Bucket=self._bucket, Key=self._prefix + key)
+
+
+class FileRefs:
+    # One row per stored object, {_id: key, refs: posts using it, releasedAt}. Uploads and
+    # deletes only move the count; collect() removes objects whose count stayed at zero for
+    # the grace period. To collect, it first sets refs to -1, which acquire() can no longer
+    # match: an upload that deduplicated against the object just then fails instead of
+    # leaving its post on a deleted file.
+
+    def __init__(self, refs_collection, posts_collection):
+        self._refs = refs_collection
+        self._posts = posts_collection
+
+    def acquire(self, key):
+        # After storage.save(), before the post is inserted. False: being collected, retry.
+        query, update = {"_id": key, "refs": {"$gte": 0}}, {"$inc": {"refs": 1}}
+        try:
+            self._refs.update_one(query, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            # Either a concurrent first upload of the same bytes or a collection in progress
+            return self._refs.update_one(query, update).matched_count > 0
+
+    def release(self, key):
+        now = datetime.now()
+        if self._refs.update_one({"_id": key, "refs": {"$gt": 0}},
+                                 {"$inc": {"refs": -1}, "$set": {"releasedAt": now}}).matched_count:
+            return
+        # Uploaded before objects were counted: start from the posts that are left
+        self._refs.update_one(
+            {"_id": key},
+            {"$setOnInsert": {"refs": self._posts.count_documents({"fileKey": key}), "releasedAt": now}},
+            upsert=True
+        )
+
+    def collect(self, storage, grace_seconds=FILE_GRACE_SECONDS, dry_run=False):
+        # Returns the keys removed (or, with dry_run, the ones that would be)
+        cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+        unused = {"refs": 0, "releasedAt": {"$lt": cutoff}}
+        removed = []
+        for ref in list(self._refs.find(unused, {"_id": 1})):
+            key = ref["_id"]
+            if dry_run:
+                removed.append(key)
+                continue
+            if not self._refs.update_one({"_id": key, **unused}, {"$set": {"refs": -1}}).modified_count:
+                continue
+            remaining = self._posts.count_documents({"fileKey": key})
+            if remaining:
+                # Counted too low (posts from before counting); nothing is deleted
+                self._refs.update_one({"_id": key}, {"$set": {"refs": remaining}})
+                continue
+            storage.delete(key)
+            self._refs.delete_one({"_id": key, "refs": -1})
+            removed.append(key)
+        return removed
+
+
+def storage_from_env(upload_folder):
+    # FILE_STORAGE=local (default) or s3 with S3_BUCKET and optionally S3_ENDPOINT_URL;
+    # credentials come from the usual AWS_* environment variables
+    if os.environ.get("FILE_STORAGE", "local") == "s3":
+        return S3Storage(os.environ["S3_BUCKET"], endpoint_url=os.environ.get("S3_ENDPOINT_URL"))
+    return LocalStorage(upload_folder)